@@ -3,13 +3,68 @@ from tkinter import ttk, filedialog, messagebox
 from PIL import Image, ImageTk
 import subprocess
 import platform
+import json
 import os
+import re
 import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # ייבוא מהספרייה המאוחדת — מקור יחיד לקוד
 from jigsaw_puzzle_generator import (
-    createPuzzlePieces, create_rectangular_pieces,
+    EncoderConfig, Profiler, PuzzleCancelled, PuzzleSession, TabVariation, fileStamp,
+    loadAtlasSheet,
 )
+from puzzle_cache import PuzzleCache
+
+# תצוגת החלקים: גודל התמונה הממוזערת, גודל תא בקנבס (רוחב, גובה), מספר
+# תמונות שנוצרות בכל סבב של root.after, ומספר החוטים שמפענחים ומקטינים
+THUMB_SIZE = 80
+THUMB_CELL = (90, 100)
+THUMB_BATCH = 24
+THUMB_WORKERS = min(4, os.cpu_count() or 1)
+
+_PIECE_NAME = re.compile(r"piece_(\d+)_(\d+)\.")
+
+# פירמידת התצוגה המקדימה: הצלע הארוכה של הרמה הגדולה ושל הקטנה ביותר,
+# ומספר התמונות (מקור + תצוגת הפאזל) שהפירמידות שלהן נשמרות
+PYRAMID_MAX = 3072
+PYRAMID_MIN = 128
+PYRAMID_CACHE_SIZE = 2
+
+
+class PreviewPyramid:
+    """רמות הקטנה (mipmap) של תמונה לתצוגה — התמונה מפוענחת פעם אחת, ב-JPEG
+    כבר בגודל מוקטן (draft), וכל רמה היא חצי מקודמתה (Image.reduce).
+    fit() מקטינה מהרמה הקטנה ביותר שעדיין גדולה מהיעד, כך שציור מחדש בשינוי
+    גודל החלון עולה מילישניות בלי קשר לגודל המקור
+    """
+    def __init__(self, image_input):
+        image = Image.open(image_input) if isinstance(image_input, str) else image_input
+        self.size = image.size
+        width, height = self.size
+        scale = min(1.0, PYRAMID_MAX / max(width, height))
+        image.draft(None, (max(1, int(width * scale)), max(1, int(height * scale))))
+        if image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA")
+        factor = -(-max(image.size) // PYRAMID_MAX)
+        level = image.reduce(factor) if factor > 1 else image
+        level.load()
+        self.levels = [level]
+        while max(level.size) >= 2 * PYRAMID_MIN:
+            level = level.reduce(2)
+            self.levels.append(level)
+
+    def fit(self, size):
+        """התמונה בגודל size — מהרמה הקטנה ביותר שמכסה אותו"""
+        for level in reversed(self.levels):
+            if level.size[0] >= size[0] and level.size[1] >= size[1]:
+                break
+        else:
+            level = self.levels[0]
+        if level.size == size:
+            return level
+        return level.resize(size, Image.Resampling.LANCZOS)
 
 
 class PuzzleCreatorUI:
@@ -26,6 +81,25 @@ class PuzzleCreatorUI:
         self.output_preview = None
         self.last_preview_path = None
         self._resize_after_id = None
+        # ביטול היצירה הנוכחית, ועדכון ההתקדמות האחרון שעוד לא הוצג
+        self._cancel = threading.Event()
+        self._pending_progress = None
+        # תמונות ממוזערות של החלקים — רק התאים הנראים (ועוד מסך לכל צד)
+        # מוחזקים כ-PhotoImage; הפענוח וההקטנה רצים ב-pool של חוטים
+        self._thumb_pool = ThreadPoolExecutor(THUMB_WORKERS)
+        self._thumb_sources = []
+        self._thumb_rows = 1
+        self._thumb_photos = {}
+        self._thumb_pending = {}
+        self._thumb_results = deque()
+        self._thumb_generation = 0
+        self._thumb_flush_id = None
+        # פירמידות תצוגה לפי נתיב — (חותמת הקובץ, PreviewPyramid)
+        self._pyramids = {}
+        # יצירה חוזרת של אותו פאזל נטענת מהמטמון במקום להיות מחושבת מחדש
+        self.cache = PuzzleCache()
+        # התמונה המפוענחת והפריסות שחושבו — נשמרות כל עוד התמונה לא הוחלפה
+        self.session = None
 
         self.create_ui()
 
@@ -98,6 +172,19 @@ class PuzzleCreatorUI:
         self.cols_var = tk.StringVar(value="6")
         ttk.Entry(grid_frame, textvariable=self.cols_var, width=10).grid(row=1, column=1, padx=5, pady=5)
 
+        # מספר תהליכים לרינדור מקבילי (פאזל קלאסי)
+        ttk.Label(grid_frame, text="תהליכים:").grid(row=2, column=0, padx=5, pady=5)
+        self.workers_var = tk.StringVar(value="1")
+        ttk.Spinbox(grid_frame, from_=1, to=os.cpu_count() or 1,
+                    textvariable=self.workers_var, width=8).grid(row=2, column=1, padx=5, pady=5)
+
+        # לשונית שונה לכל תפר (פאזל קלאסי) — אותו seed נותן שוב אותו פאזל
+        self.random_tabs = tk.BooleanVar(value=False)
+        ttk.Checkbutton(grid_frame, text="לשוניות אקראיות, seed:",
+                        variable=self.random_tabs).grid(row=3, column=0, padx=5, pady=5)
+        self.seed_var = tk.StringVar(value="1")
+        ttk.Entry(grid_frame, textvariable=self.seed_var, width=10).grid(row=3, column=1, padx=5, pady=5)
+
         # אפשרויות ייצוא
         export_frame = ttk.LabelFrame(left_panel, text="אפשרויות ייצוא")
         export_frame.pack(fill=tk.X, pady=5)
@@ -107,6 +194,8 @@ class PuzzleCreatorUI:
                          variable=self.export_format, value="png").pack(anchor=tk.W)
         ttk.Radiobutton(export_frame, text="JPEG (איכות גבוהה)",
                          variable=self.export_format, value="jpeg").pack(anchor=tk.W)
+        ttk.Radiobutton(export_frame, text="WebP (קטן ומהיר, עם שקיפות)",
+                         variable=self.export_format, value="webp").pack(anchor=tk.W)
 
         quality_frame = ttk.Frame(export_frame)
         quality_frame.pack(fill=tk.X, pady=5)
@@ -119,6 +208,16 @@ class PuzzleCreatorUI:
         self.quality_value_label = ttk.Label(quality_frame, text="95")
         self.quality_value_label.pack(side=tk.LEFT, padx=(0, 5))
 
+        # אטלס — כל החלקים בגיליונות טקסטורה + אינדקס JSON במקום קובץ לכל חלק
+        self.export_atlas = tk.BooleanVar(value=False)
+        ttk.Checkbutton(export_frame, text="אטלס (גיליון אחד לכל החלקים)",
+                        variable=self.export_atlas).pack(anchor=tk.W)
+
+        # קצוות מוחלקים — alpha לפי שטח כיסוי בשולי החלק (פאזל קלאסי)
+        self.export_antialias = tk.BooleanVar(value=False)
+        ttk.Checkbutton(export_frame, text="קצוות חלקים (anti-aliasing)",
+                        variable=self.export_antialias).pack(anchor=tk.W)
+
         # בחירת תיקיית פלט
         output_frame = ttk.Frame(left_panel)
         output_frame.pack(fill=tk.X, pady=5)
@@ -134,13 +233,20 @@ class PuzzleCreatorUI:
         self.create_btn = ttk.Button(left_panel, text="צור פאזל", command=self.create_puzzle)
         self.create_btn.pack(pady=10)
 
-        # פס התקדמות
-        self.progress = ttk.Progressbar(left_panel, mode='indeterminate')
+        # פס התקדמות — חלקים שהושלמו מתוך הסך הכולל
+        self.progress = ttk.Progressbar(left_panel, mode='determinate')
+
+        # כפתור ביטול — מוצג רק בזמן יצירה
+        self.cancel_btn = ttk.Button(left_panel, text="בטל", command=self.cancel_puzzle)
 
         # תווית סטטוס
         self.status_label = ttk.Label(left_panel, text="")
         self.status_label.pack(pady=5)
 
+        # פירוט זמנים לפי שלב מהריצה האחרונה
+        self.profile_label = ttk.Label(left_panel, text="", justify=tk.LEFT)
+        self.profile_label.pack(pady=5)
+
         # כפתור פתיחת תיקייה
         self.open_folder_btn = ttk.Button(left_panel, text="פתח תיקיית פלט",
                                           command=lambda: self.open_output_folder(self.output_dir.get()))
@@ -161,24 +267,14 @@ class PuzzleCreatorUI:
 
         self.pieces_canvas = tk.Canvas(canvas_frame, height=200)
         scrollbar = ttk.Scrollbar(canvas_frame, orient="horizontal",
-                                  command=self.pieces_canvas.xview)
+                                  command=self._on_pieces_scroll)
 
         self.pieces_canvas.pack(fill=tk.X)
         scrollbar.pack(fill=tk.X)
 
         self.pieces_canvas.configure(xscrollcommand=scrollbar.set)
 
-        # מסגרת לחלקים
-        self.pieces_frame = ttk.Frame(self.pieces_canvas)
-        self.canvas_window = self.pieces_canvas.create_window(
-            (0, 0),
-            window=self.pieces_frame,
-            anchor='nw',
-            tags='pieces_frame'
-        )
-
-        # קישור לשינוי גודל
-        self.pieces_frame.bind('<Configure>', self.on_frame_configure)
+        # קישור לשינוי גודל — החלקים הם פריטי קנבס, לא widget לכל חלק
         self.pieces_canvas.bind('<Configure>', self.on_canvas_configure)
         right_panel.bind('<Configure>', lambda e: self.on_right_panel_configure(e, right_canvas))
 
@@ -191,55 +287,151 @@ class PuzzleCreatorUI:
             self.output_dir.set(directory)
 
     def update_pieces_preview(self):
-        """עדכון תצוגה מקדימה של החלקים"""
-        for widget in self.pieces_frame.winfo_children():
-            widget.destroy()
+        """עדכון תצוגה מקדימה של החלקים — וירטואלית: רק התאים בטווח הגלילה
+        מפוענחים ומצוירים, כך שהממשק לא נתקע גם ב-2500 חלקים"""
+        self._thumb_generation += 1
+        for future in self._thumb_pending.values():
+            future.cancel()
+        self._thumb_pending.clear()
+        self._thumb_photos.clear()
+        self.pieces_canvas.delete("thumb")
 
         pieces_dir = self.output_dir.get()
-        if not os.path.exists(pieces_dir):
-            return
+        self._thumb_sources = self._piece_sources(pieces_dir) if os.path.exists(pieces_dir) else []
+
+        # החלקים מסודרים בעמודות של rows_per_strip תאים, והרצועה נגללת אופקית
+        cell_w, cell_h = THUMB_CELL
+        self._thumb_rows = max(1, int(self.pieces_canvas.cget("height")) // cell_h)
+        columns = -(-len(self._thumb_sources) // self._thumb_rows)
+        self.pieces_canvas.configure(scrollregion=(0, 0, columns * cell_w,
+                                                   self._thumb_rows * cell_h))
+        self.pieces_canvas.xview_moveto(0)
+        self._refresh_thumbnails()
+
+    def _piece_sources(self, pieces_dir):
+        """רשימת (שם, טוען) לכל חלק לפי סדר שורות; הטוען רץ בחוט רקע ומחזיר
+        את תמונת החלק — מהאטלס (גיליון נטען פעם אחת), או מקובץ החלק"""
+        atlas_path = os.path.join(pieces_dir, "piece_atlas.json")
+        if self.export_atlas.get() and os.path.exists(atlas_path):
+            with open(atlas_path, encoding="utf-8") as f:
+                index = json.load(f)
+            sheets = {}
+            lock = threading.Lock()
+
+            def loader(entry):
+                def load():
+                    with lock:
+                        sheet = sheets.get(entry["sheet"])
+                        if sheet is None:
+                            sheet = sheets[entry["sheet"]] = loadAtlasSheet(
+                                os.path.join(pieces_dir, index["sheets"][entry["sheet"]]))
+                    x, y, w, h = entry["rect"]
+                    return sheet.crop((x, y, x + w, y + h))
+                return load
+
+            return [(f"{entry['row']}_{entry['col']}", loader(entry))
+                    for entry in index["pieces"]]
+
+        def order(name):
+            match = _PIECE_NAME.match(name)
+            return (0, int(match[1]), int(match[2])) if match else (1, name)
 
         piece_files = sorted([f for f in os.listdir(pieces_dir)
-                              if f.startswith("piece_") and not f.startswith("piece_outline")])
-
-        grid_frame = ttk.Frame(self.pieces_frame)
-        grid_frame.pack(fill=tk.BOTH, expand=True)
-
-        row = 0
-        col = 0
-        cols_per_row = 8
-
-        for i, piece_file in enumerate(piece_files):
+                              if f.startswith("piece_") and not f.startswith("piece_outline")
+                              and not f.startswith("piece_atlas")
+                              and not f.endswith(EncoderConfig.MASK_SUFFIX)], key=order)
+        return [(piece_file, lambda path=os.path.join(pieces_dir, piece_file): Image.open(path))
+                for piece_file in piece_files]
+
+    @staticmethod
+    def _load_thumbnail(load):
+        """פענוח והקטנה של חלק — בחוט רקע (Pillow משחרר את ה-GIL)"""
+        image = load()
+        # ב-JPEG הפענוח עצמו נעשה בגודל מוקטן
+        image.draft(None, (THUMB_SIZE, THUMB_SIZE))
+        image.thumbnail((THUMB_SIZE, THUMB_SIZE))
+        return image
+
+    def _visible_range(self):
+        """טווח האינדקסים שצריכים תמונה — המסך הנראה ועוד מסך לכל צד"""
+        cell_w = THUMB_CELL[0]
+        width = max(cell_w, self.pieces_canvas.winfo_width())
+        left = self.pieces_canvas.canvasx(0)
+        first = max(0, int((left - width) // cell_w))
+        last = int((left + 2 * width) // cell_w) + 1
+        return first * self._thumb_rows, min(len(self._thumb_sources), last * self._thumb_rows)
+
+    def _refresh_thumbnails(self):
+        """שליחת התאים החסרים בטווח לפענוח, ושחרור תמונות שיצאו מהטווח"""
+        if not self._thumb_sources:
+            return
+        first, last = self._visible_range()
+        for index in [i for i in self._thumb_photos if not first <= i < last]:
+            del self._thumb_photos[index]
+            self.pieces_canvas.delete(f"thumb{index}")
+        for index in [i for i in self._thumb_pending if not first <= i < last]:
+            self._thumb_pending.pop(index).cancel()
+
+        generation = self._thumb_generation
+        for index in range(first, last):
+            if index in self._thumb_photos or index in self._thumb_pending:
+                continue
+            future = self._thumb_pool.submit(self._load_thumbnail, self._thumb_sources[index][1])
+            future.add_done_callback(
+                lambda f, index=index: self._thumb_results.append((generation, index, f)))
+            self._thumb_pending[index] = future
+        if self._thumb_pending and self._thumb_flush_id is None:
+            self._thumb_flush_id = self.root.after(15, self._flush_thumbnails)
+
+    def _flush_thumbnails(self):
+        """יצירת עד THUMB_BATCH פריטי קנבס מהתוצאות המוכנות — ב-main thread"""
+        self._thumb_flush_id = None
+        cell_w, cell_h = THUMB_CELL
+        for _ in range(min(THUMB_BATCH, len(self._thumb_results))):
+            generation, index, future = self._thumb_results.popleft()
+            if generation != self._thumb_generation or future.cancelled() or \
+                    self._thumb_pending.get(index) is not future:
+                continue
+            del self._thumb_pending[index]
+            name = self._thumb_sources[index][0]
             try:
-                piece_path = os.path.join(pieces_dir, piece_file)
-                piece_image = Image.open(piece_path)
-
-                piece_image.thumbnail((80, 80))
-                photo = ImageTk.PhotoImage(piece_image)
-
-                piece_frame = ttk.Frame(grid_frame)
-                piece_frame.grid(row=row, column=col, padx=2, pady=2)
-
-                label = ttk.Label(piece_frame, image=photo)
-                label.image = photo
-                label.pack()
-
-                ttk.Label(piece_frame, text=f"{i + 1}").pack()
-
-                col += 1
-                if col >= cols_per_row:
-                    col = 0
-                    row += 1
-
+                photo = ImageTk.PhotoImage(future.result())
             except Exception as e:
-                print(f"Error loading piece {piece_file}: {str(e)}")
-
-        self.pieces_frame.update_idletasks()
-        self.pieces_canvas.configure(scrollregion=self.pieces_canvas.bbox("all"))
+                print(f"Error loading piece {name}: {str(e)}")
+                continue
+            self._thumb_photos[index] = photo
+            column, row = divmod(index, self._thumb_rows)
+            x = column * cell_w + cell_w // 2
+            y = row * cell_h
+            tags = ("thumb", f"thumb{index}")
+            self.pieces_canvas.create_image(x, y + 2 + THUMB_SIZE // 2, image=photo, tags=tags)
+            self.pieces_canvas.create_text(x, y + THUMB_SIZE + 10, text=f"{index + 1}", tags=tags)
+        if self._thumb_pending or self._thumb_results:
+            self._thumb_flush_id = self.root.after(15, self._flush_thumbnails)
+
+    def _on_pieces_scroll(self, *args):
+        self.pieces_canvas.xview(*args)
+        self._refresh_thumbnails()
+
+    def _pyramid(self, image_path):
+        """פירמידת התצוגה של קובץ — נבנית מחדש רק כשהקובץ השתנה"""
+        stamp = fileStamp(image_path)
+        cached = self._pyramids.get(image_path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        pyramid = PreviewPyramid(image_path)
+        self._store_pyramid(image_path, pyramid, stamp)
+        return pyramid
+
+    def _store_pyramid(self, image_path, pyramid, stamp=None):
+        self._pyramids.pop(image_path, None)
+        if len(self._pyramids) >= PYRAMID_CACHE_SIZE:
+            self._pyramids.pop(next(iter(self._pyramids)))
+        self._pyramids[image_path] = (stamp or fileStamp(image_path), pyramid)
 
     def show_preview(self, image_path, label):
         """הצגת תמונה בתווית עם התאמה אוטומטית"""
-        image = Image.open(image_path)
+        pyramid = self._pyramid(image_path)
 
         if label == self.preview_label:
             max_width = 250
@@ -248,16 +440,16 @@ class PuzzleCreatorUI:
             max_width = max(200, self.root.winfo_width() - 400)
             max_height = max(200, int(self.root.winfo_height() * 0.6))
 
-        img_ratio = image.size[0] / image.size[1]
+        img_ratio = pyramid.size[0] / pyramid.size[1]
 
-        if image.size[0] > image.size[1]:
-            new_width = min(max_width, image.size[0])
+        if pyramid.size[0] > pyramid.size[1]:
+            new_width = min(max_width, pyramid.size[0])
             new_height = int(new_width / img_ratio)
             if new_height > max_height:
                 new_height = max_height
                 new_width = int(new_height * img_ratio)
         else:
-            new_height = min(max_height, image.size[1])
+            new_height = min(max_height, pyramid.size[1])
             new_width = int(new_height * img_ratio)
             if new_width > max_width:
                 new_width = max_width
@@ -266,7 +458,7 @@ class PuzzleCreatorUI:
         new_width = max(1, int(new_width))
         new_height = max(1, int(new_height))
 
-        resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        resized_image = pyramid.fit((new_width, new_height))
         photo = ImageTk.PhotoImage(resized_image)
 
         if label == self.preview_label:
@@ -284,10 +476,11 @@ class PuzzleCreatorUI:
             ]
         )
         if self.image_path:
+            # בחירה מחדש (גם של אותו קובץ) פותחת סשן חדש ביצירה הבאה
+            self.session = None
             self.show_preview(self.image_path, self.preview_label)
-            # הצגת מידע על התמונה
-            img = Image.open(self.image_path)
-            w, h = img.size
+            # הצגת מידע על התמונה — מהפירמידה, בלי לפתוח את הקובץ שוב
+            w, h = self._pyramid(self.image_path).size
             self.image_info_label.config(text=f"{w}x{h} px")
             self.status_label.config(text=f"נבחרה תמונה: {os.path.basename(self.image_path)}")
 
@@ -299,8 +492,10 @@ class PuzzleCreatorUI:
         try:
             rows = int(self.rows_var.get())
             cols = int(self.cols_var.get())
+            workers = int(self.workers_var.get())
+            variation = TabVariation(int(self.seed_var.get())) if self.random_tabs.get() else None
 
-            if rows < 1 or cols < 1:
+            if rows < 1 or cols < 1 or workers < 1:
                 raise ValueError
             if rows > 50 or cols > 50:
                 messagebox.showerror("שגיאה", "מספר שורות/עמודות מקסימלי: 50")
@@ -309,17 +504,66 @@ class PuzzleCreatorUI:
             messagebox.showerror("שגיאה", "נא להזין מספרים חיוביים בלבד")
             return
 
-        # מעבר למצב "עובד" — פס התקדמות + חסימת כפתור
+        encoder = self._encoder_config()
+
+        # מעבר למצב "עובד" — פס התקדמות + כפתור ביטול + חסימת כפתור היצירה
         self.create_btn.config(state='disabled')
+        self._cancel.clear()
+        self.progress.config(maximum=rows * cols, value=0)
         self.progress.pack(pady=5, fill=tk.X, before=self.status_label)
-        self.progress.start(15)
+        self.cancel_btn.config(state='normal')
+        self.cancel_btn.pack(pady=5, before=self.status_label)
         self.status_label.config(text="יוצר פאזל...")
 
         # הרצה ב-thread נפרד כדי לא לחסום את הממשק
-        thread = threading.Thread(target=self._generate_puzzle, args=(rows, cols), daemon=True)
+        thread = threading.Thread(target=self._generate_puzzle,
+                                  args=(rows, cols, workers, encoder, self.export_atlas.get(),
+                                        self.export_antialias.get(), variation),
+                                  daemon=True)
         thread.start()
 
-    def _generate_puzzle(self, rows, cols):
+    def cancel_puzzle(self):
+        """בקשת ביטול — היצירה נעצרת אחרי החלק הנוכחי"""
+        self._cancel.set()
+        self.cancel_btn.config(state='disabled')
+        self.status_label.config(text="מבטל...")
+
+    def _on_progress(self, state):
+        """קולבק התקדמות מה-thread של היצירה — רק שומר את המצב האחרון, והממשק
+        מתעדכן לכל היותר פעם ב-50ms (ולא פעם לכל חלק)"""
+        update = (state.done, state.total, state.bytes, state.eta)
+        if self._pending_progress is None:
+            self.root.after(50, self._show_progress)
+        self._pending_progress = update
+
+    def _show_progress(self):
+        update, self._pending_progress = self._pending_progress, None
+        if update is None or self._cancel.is_set():
+            return
+        done, total, written, eta = update
+        self.progress.config(value=done)
+        text = f"יוצר פאזל... {done}/{total} חלקים, {written / (1024 * 1024):.1f} MB"
+        if eta is not None and done < total:
+            text += f", עוד כ-{eta:.0f} שניות"
+        self.status_label.config(text=text)
+
+    def _end_progress(self):
+        self.progress.pack_forget()
+        self.cancel_btn.pack_forget()
+        self.create_btn.config(state='normal')
+
+    def _encoder_config(self):
+        """הגדרות הקידוד לפי אפשרויות הייצוא — PNG נשמר ברמת דחיסה מהירה"""
+        fmt = self.export_format.get()
+        quality = int(self.export_quality.get())
+        if fmt == "png":
+            return EncoderConfig("png", compress_level=1)
+        if fmt == "webp":
+            return EncoderConfig("webp", quality=quality, lossless=quality >= 100)
+        return EncoderConfig("jpeg", quality=quality)
+
+    def _generate_puzzle(self, rows, cols, workers=1, encoder=None, atlas=False,
+                         antialias=False, variation=None):
         """יצירת הפאזל ב-thread נפרד"""
         try:
             output_dir = self.output_dir.get()
@@ -328,46 +572,73 @@ class PuzzleCreatorUI:
 
             output_prefix = f"{output_dir}/piece_"
 
-            if self.puzzle_type.get() == "rectangular":
-                create_rectangular_pieces(self.image_path, rows, cols, output_prefix)
-            else:
-                createPuzzlePieces(self.image_path, rows, cols, output_prefix)
+            mode = self.puzzle_type.get()
+            # סשן חדש גם כשהקובץ נכתב מחדש — הסשן מחזיק את הפיקסלים שפוענחו בפתיחה
+            if (self.session is None or self.session.image_input != self.image_path or
+                    self.session.stamp != fileStamp(self.image_path)):
+                self.session = PuzzleSession(self.image_path)
+            profiler = Profiler()
+            extra = {} if mode == "rectangular" else {"workers": workers,
+                                                      "antialias": antialias,
+                                                      "variation": variation}
+            preview, hit = self.cache.run(self.session, rows, cols, output_prefix, mode=mode,
+                                          encoder=encoder, atlas=atlas, profiler=profiler,
+                                          progress=self._on_progress, cancel=self._cancel,
+                                          **extra)
+            # פירמידת התצוגה נבנית כאן מהתמונה שכבר בזיכרון, לא ב-main thread
+            pyramid = PreviewPyramid(preview)
 
             # עדכון UI ב-thread הראשי
-            self.root.after(0, self._on_puzzle_complete, output_prefix)
+            self.root.after(0, self._on_puzzle_complete, output_prefix, hit, profiler, pyramid)
 
+        except PuzzleCancelled:
+            self.root.after(0, self._on_puzzle_cancelled)
         except Exception as e:
             self.root.after(0, self._on_puzzle_error, str(e))
 
-    def _on_puzzle_complete(self, output_prefix):
+    def _on_puzzle_complete(self, output_prefix, hit=None, profiler=None, pyramid=None):
         """קולבק לסיום יצירת הפאזל — רץ ב-main thread"""
-        self.progress.stop()
-        self.progress.pack_forget()
-        self.create_btn.config(state='normal')
+        self._end_progress()
 
         preview_path = f"{output_prefix}outline_with_image.png"
         self.last_preview_path = preview_path
+        if pyramid is not None:
+            self._store_pyramid(preview_path, pyramid)
         self.show_preview(preview_path, self.output_label)
 
         self.update_pieces_preview()
 
-        self.status_label.config(text="הפאזל נוצר בהצלחה!")
+        self.status_label.config(text="הפאזל נטען מהמטמון!" if hit == "full"
+                                 else "הפאזל נוצר בהצלחה!")
+        self.profile_label.config(text=self._format_profile(profiler))
         self.open_folder_btn.pack(pady=5)
 
+    def _format_profile(self, profiler):
+        """שורה לכל שלב: זמן כולל, מספר חלקים/קריאות ונפח שנכתב"""
+        if profiler is None or not profiler.events:
+            return ""
+        lines = []
+        for stage, total in profiler.summary().items():
+            line = f"{stage:<9} {total['seconds']:7.3f}s  ×{total['count']}"
+            if total["bytes"]:
+                line += f"  {total['bytes'] / (1024 * 1024):.1f} MB"
+            lines.append(line)
+        return "\n".join(lines)
+
     def _on_puzzle_error(self, error_msg):
         """קולבק לשגיאה ביצירת הפאזל"""
-        self.progress.stop()
-        self.progress.pack_forget()
-        self.create_btn.config(state='normal')
+        self._end_progress()
         messagebox.showerror("שגיאה", f"אירעה שגיאה ביצירת הפאזל: {error_msg}")
         self.status_label.config(text="אירעה שגיאה")
 
-    def on_frame_configure(self, event=None):
-        self.pieces_canvas.configure(scrollregion=self.pieces_canvas.bbox("all"))
+    def _on_puzzle_cancelled(self):
+        """קולבק לביטול — לא נשאר פלט חלקי, והתצוגה הקודמת נשארת כמו שהיא"""
+        self._end_progress()
+        self.status_label.config(text="היצירה בוטלה")
 
     def on_canvas_configure(self, event):
-        canvas_width = event.width
-        self.pieces_canvas.itemconfig('pieces_frame', width=canvas_width)
+        # רוחב חדש חושף תאים נוספים
+        self._refresh_thumbnails()
 
     def on_right_panel_configure(self, event, canvas):
         canvas.configure(scrollregion=canvas.bbox("all"))
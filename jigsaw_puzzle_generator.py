@@ -1,7 +1,16 @@
 
 import numpy as np
-from PIL import Image, ImageDraw
+from PIL import Image, ImageDraw, features
+import io
+import json
 import os
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import lru_cache
+from multiprocessing import shared_memory
 
 # קבועים גלובליים
 t_FEMALE = 1
@@ -12,6 +21,40 @@ t_LINE = 3
 DEFAULT_ARC_RATIO = 0.07
 DEFAULT_CONNECT_RATIO = 0.3
 DEFAULT_POINT_NUM = 300
+# סף שגיאה בפיקסלים לדגימה אדפטיבית (tolerance=...) — ברירת המחדל נשארת
+# DEFAULT_POINT_NUM נקודות קבועות לכל מקטע, לשחזוריות
+DEFAULT_TOLERANCE = 0.25
+
+# פקטור דגימת-יתר לשכבת קווי המתאר בתצוגה המקדימה (החלקה של הקווים)
+OUTLINE_SUPERSAMPLE = 2
+
+# מסכות מוחלקות (antialias=True): מספר תת-שורות סריקה לכל שורת פיקסלים
+ANTIALIAS_SUBSAMPLES = 4
+
+# מצב streaming: גודל מקסימלי של התצוגה המקדימה וגובה רצועת קריאה בשורות
+STREAM_PREVIEW_MAX = 4096
+STREAM_PREVIEW_BAND = 256
+
+# מצב אטלס: גודל מקסימלי של גיליון טקסטורה וריווח בין חלקים בפיקסלים
+ATLAS_MAX_SIZE = 4096
+ATLAS_PADDING = 2
+
+# מספר חלקים בכל משימה שנשלחת ל-RenderPool
+RENDER_CHUNK = 4
+
+# מטמון תבניות קצוות לפי גאומטריית חלק — (w, h, יחסים, מספר נקודות) -> תבניות
+EDGE_TEMPLATE_CACHE_SIZE = 64
+_EDGE_TEMPLATE_CACHE = {}
+
+# לשוניות משתנות (TabVariation): כל לשונית נשמרת בתוך אזור התפר שלה (ראה
+# _fitTabs) במקדם מרווח זה; מספר החלוקות של כל מקטע בבדיקה, וצעדי החיפוש
+TAB_CLEARANCE = 0.95
+TAB_FIT_SPLITS = 8
+TAB_FIT_STEPS = 10
+
+# מספר הפריסות, ומסכות קווי המתאר (בית לפיקסל בתצוגה), שנשמרות ב-PuzzleSession
+SESSION_GEOMETRY_CACHE_SIZE = 8
+SESSION_OUTLINE_CACHE_SIZE = 2
 
 
 def computeBezierPoint(points, t):
@@ -33,27 +76,283 @@ def computeBezierPoint(points, t):
     return (x, y)
 
 
+@lru_cache(maxsize=32)
+def _bezierBasis(num):
+    """מטריצת מקדמי ברנשטיין (num, 4) עבור t = i / num — מחושבת פעם אחת לכל num"""
+    t = np.arange(num, dtype=np.float64) / num
+    mt = 1.0 - t
+    basis = np.stack([mt * mt * mt, 3.0 * mt * mt * t, 3.0 * mt * t * t, t * t * t], axis=1)
+    basis.setflags(write=False)
+    return basis
+
+
+@lru_cache(maxsize=32)
+def _powerBasis(num):
+    """(t, t^2, t^3) עבור t = i * (1 / num), כל אחד (num, 1) — אותן פעולות
+    בדיוק כמו computeBezierPoint בלולאה"""
+    t = np.arange(num, dtype=np.float64) * (1.0 / num)
+    tSquared = t * t
+    powers = (t[:, None], tSquared[:, None], (tSquared * t)[:, None])
+    for power in powers:
+        power.setflags(write=False)
+    return powers
+
+
+@lru_cache(maxsize=8)
+def _bezierSplitMatrix(n):
+    """מטריצות (n, 4, 4) שמפצלות מקטע בזייה ל-n תת-מקטעים שווים ב-t:
+    נקודות הבקרה של תת-המקטע ה-i הן matrix[i] @ points"""
+    def basis(t):
+        mt = 1.0 - t
+        return np.array([mt * mt * mt, 3.0 * mt * mt * t, 3.0 * mt * t * t, t * t * t])
+
+    def derivative(t):
+        mt = 1.0 - t
+        return 3.0 * np.array([-mt * mt, mt * mt - 2.0 * mt * t, 2.0 * mt * t - t * t, t * t])
+
+    matrices = []
+    for i in range(n):
+        t0, t1 = i / n, (i + 1) / n
+        d = (t1 - t0) / 3.0
+        matrices.append([basis(t0), basis(t0) + d * derivative(t0),
+                         basis(t1) - d * derivative(t1), basis(t1)])
+    matrix = np.array(matrices)
+    matrix.setflags(write=False)
+    return matrix
+
+
+def computerBezierBatch(segments, num):
+    """חישוב וקטורי של כמה עקומות בזייה בבת אחת.
+    segments: מערך נקודות בקרה בצורה (S, 4, 2)
+    מחזיר מערך (S * num, 2) — הנקודות של כל העקומות ברצף.
+    הצורה הפולינומית של computeBezierPoint, באותו סדר פעולות, כך שהנקודות
+    זהות עד הביט לחישוב נקודה-נקודה (ולכן גם המסכות)
+    """
+    segs = np.asarray(segments, dtype=np.float64).reshape(-1, 4, 2)
+    t, tSquared, tCubed = _powerBasis(num)
+    p0, p1, p2, p3 = (segs[:, None, k] for k in range(4))
+    c = 3.0 * (p1 - p0)
+    b = 3.0 * (p2 - p1) - c
+    a = p3 - p0 - c - b
+    return ((a * tCubed) + (b * tSquared) + (c * t) + p0).reshape(-1, 2)
+
+
 def computerBezier(points, num):
-    """יצירת מערך נקודות על העקומה"""
-    dt = 1.0 / num
-    curvePoints = []
-    for i in range(num):
-        p = computeBezierPoint(points, dt * i)
-        curvePoints.append(p)
-    return curvePoints
+    """יצירת מערך נקודות על העקומה — מחזיר מערך numpy בצורה (num, 2)"""
+    return computerBezierBatch(points, num)
+
+
+def bezierSegmentCounts(segments, tolerance):
+    """מספר הנקודות לכל מקטע כך שהמרחק בין הקו השבור לעקומה <= tolerance.
+    לחלוקה אחידה ל-n חלקים השגיאה חסומה ע"י max|B''| / (8 n^2), ו-max|B''|
+    חסום ע"י 6 * ההפרש השני הגדול של נקודות הבקרה
+    """
+    segs = np.asarray(segments, dtype=np.float64).reshape(-1, 4, 2)
+    second = segs[:, :2] - 2.0 * segs[:, 1:3] + segs[:, 2:]
+    curvature = np.linalg.norm(second, axis=2).max(axis=1)
+    return np.maximum(1, np.ceil(np.sqrt(0.75 * curvature / tolerance))).astype(int)
+
+
+def computerBezierAdaptive(segments, tolerance):
+    """כמו computerBezierBatch, אבל מספר הנקודות בכל מקטע נקבע לפי העקמומיות
+    וגודל המקטע בפיקסלים — חלקים קטנים מקבלים מצולעים קטנים בהתאם.
+    נקודת הסיום של המקטע האחרון נכללת: עם מעט נקודות, השמטתה הייתה חותכת את
+    פינת החלק (עם 300 נקודות קבועות הפער זניח)
+    """
+    segs = np.asarray(segments, dtype=np.float64).reshape(-1, 4, 2)
+    counts = bezierSegmentCounts(segs, tolerance)
+    points = [computerBezierBatch(seg, int(n)) for seg, n in zip(segs, counts)]
+    points.append(segs[-1, 3:])
+    return np.concatenate(points)
+
+
+def computerBezierChains(chains, num, tolerance=None):
+    """דגימה של הרבה שרשראות מקטעים (N, S, 4, 2) בבת אחת — רשימה של מערך
+    נקודות לכל שרשרת, כמו computerBezierBatch (tolerance=None) או
+    computerBezierAdaptive לכל שרשרת בנפרד. בדגימה האדפטיבית כל המקטעים עם
+    אותו מספר נקודות מחושבים בקריאה אחת.
+    החישוב בצורת ברנשטיין (_bezierBasis) עם matmul (BLAS) — מהיר באצוות
+    גדולות, אבל לא זהה עד הביט ל-computerBezierBatch, שנשארת בצורה
+    הפולינומית של computeBezierPoint כדי שהמסכות של הצורות הקבועות לא
+    ישתנו. כאן אין פלט קודם לשמור: רק הלשוניות של TabVariation נדגמות כך"""
+    chains = np.asarray(chains, dtype=np.float64)
+    n, perChain = chains.shape[:2]
+    if not n:
+        return []
+    segs = chains.reshape(-1, 4, 2)
+    if tolerance is None:
+        return list(np.matmul(_bezierBasis(num), segs).reshape(n, perChain * num, 2))
+    counts = bezierSegmentCounts(segs, tolerance)
+    ends = np.cumsum(counts)
+    points = np.empty((ends[-1], 2))
+    for count in np.unique(counts):
+        members = np.flatnonzero(counts == count)
+        at = (ends[members] - count)[:, None] + np.arange(count)
+        points[at] = np.matmul(_bezierBasis(int(count)), segs[members])
+    bounds = ends[perChain - 1::perChain]
+    return [np.concatenate([part, chain[-1, 3:]])
+            for part, chain in zip(np.split(points, bounds[:-1]), chains)]
+
+
+class TabVariation:
+    """צורות לשוניות אקראיות לכל תפר — במקום לשונית זהה בכל החלקים, שמאפשרת
+    לפתור את הפאזל לפי צורה בלבד. הערכים נגזרים מ-seed בלבד, ולכן אותו seed
+    ואותה רשת נותנים תמיד אותו פאזל.
+    flip: הסתברות להפוך את כיוון הלשונית (זכר/נקבה) ביחס לדוגמת השחמט
+    size: טווח יחסי (±) לגודל הלשונית — רוחב הצוואר והעומק יחד
+    shift: הזזה (±) של מרכז הלשונית לאורך הצלע, כשבר מאורך הצלע
+    skew: אסימטריה (±) — רוחב חצי אחד של הלשונית גדל והשני קטן
+    jitter: טווח יחסי (±) לעומק הראש של הלשונית
+    בקצוות הטווחים לשוניות סמוכות עלולות להיחתך; PieceInfo.tabs מכווצת כל
+    לשונית כזו לעבר הצורה הקבועה עד שהיא נכנסת לאזור התפר שלה (_fitTabs)
+    """
+    SEAM_DTYPE = np.dtype([
+        ("axis", "u1"), ("row", "<u2"), ("col", "<u2"), ("flip", "?"),
+        ("size", "<f8"), ("shift", "<f8"), ("skew", "<f8"), ("jitter", "<f8"),
+    ])
+
+    def __init__(self, seed=0, flip=0.5, size=0.1, shift=0.1, skew=0.1, jitter=0.1):
+        if not 0 <= flip <= 1:
+            raise ValueError("flip must be a probability between 0 and 1")
+        if not (0 <= size < 0.5 and 0 <= shift <= 0.15 and 0 <= skew < 0.5 and
+                0 <= jitter < 0.5):
+            raise ValueError("tab variation out of range: size, skew and jitter must be in "
+                             "[0, 0.5), shift in [0, 0.15]")
+        self.seed = seed
+        self.flip = flip
+        self.size = size
+        self.shift = shift
+        self.skew = skew
+        self.jitter = jitter
+
+    def _key(self):
+        return (self.seed, self.flip, self.size, self.shift, self.skew, self.jitter)
+
+    def __eq__(self, other):
+        return isinstance(other, TabVariation) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def seamTable(self, rows, cols):
+        """טבלת הפרמטרים של כל התפרים הפנימיים (SEAM_DTYPE): קודם האופקיים
+        (axis=0, שורות 1..rows-1), אחר כך האנכיים (axis=1, עמודות 1..cols-1),
+        לפי סדר שורות. כל הערכים מוגרלים במשיכה אחת מ-seed"""
+        hRows, hCols = np.indices((rows - 1, cols))
+        vRows, vCols = np.indices((rows, cols - 1))
+        table = np.zeros(hRows.size + vRows.size, self.SEAM_DTYPE)
+        table["axis"][hRows.size:] = 1
+        table["row"] = np.concatenate([hRows.ravel() + 1, vRows.ravel()])
+        table["col"] = np.concatenate([hCols.ravel(), vCols.ravel() + 1])
+        draws = np.random.default_rng(self.seed).random((5, len(table)))
+        table["flip"] = draws[0] < self.flip
+        table["size"] = 1.0 + self.size * (2.0 * draws[1] - 1.0)
+        table["shift"] = self.shift * (2.0 * draws[2] - 1.0)
+        table["skew"] = self.skew * (2.0 * draws[3] - 1.0)
+        table["jitter"] = self.jitter * (2.0 * draws[4] - 1.0)
+        return table
+
+
+def _tabControls(table, halfLength, arc, connect, offset):
+    """נקודות הבקרה (N, 4, 4, 2) של לשוניות נקבה לכל רשומה בטבלת התפרים,
+    בקואורדינטות התפר: u לאורך הצלע (הפינות ב-±halfLength), v בניצב לה
+    (חיובי — החוצה מהבעלים). בלי וריאציה זו בדיוק הצורה של genBottomFemale.
+    halfLength, arc ו-connect — מערכים (N,) לפי כיוון התפר"""
+    length = halfLength
+    a = arc * table["size"]
+    c = connect * table["size"]
+    u0 = table["shift"] * 2.0 * length
+    right = c * (1.0 + table["skew"])
+    left = c * (1.0 - table["skew"])
+    tip = a - c * (1.0 + table["jitter"])
+    neckR = u0 + right * 0.5
+    neckL = u0 - left * 0.5
+    dwR = length - neckR
+    dwL = length + neckL
+    mid = a + (tip - a) * 2 / 5
+    zero = np.zeros_like(a)
+
+    u = [[length, length - dwR / 3, length - 2 * dwR / 3, neckR],
+         [neckR, u0 - right / 3, u0 + right, u0],
+         [u0, u0 - left, u0 + left / 3, neckL],
+         [neckL, -length + 2 * dwL / 3, -length + dwL / 3, -length]]
+    v = [[zero, a / 3 + offset, a * 2 / 3 + offset, a],
+         [a, mid, tip, tip],
+         [tip, tip, mid, a],
+         [a, a * 2 / 3 + offset, a / 3 + offset, zero]]
+    u = np.stack([np.stack(np.broadcast_arrays(*segment), -1) for segment in u], 1)
+    v = np.stack([np.stack(np.broadcast_arrays(*segment), -1) for segment in v], 1)
+    return np.stack([u, v], -1)
+
+
+def _tabsInside(table, halfLength, depth, arc, connect, offset):
+    """(N,) bool — האם כל לשונית נמצאת כולה באזור התפר שלה:
+    |v| <= TAB_CLEARANCE * min(depth, halfLength - |u|), כש-depth חצי התא
+    בניצב לתפר. אלה האזורים של הציר האמצעי של התאים — קמורים וזרים זה לזה,
+    ולכן עקומות שבתוכם לא נחתכות. העקומה נמצאת בקמור של נקודות הבקרה של כל
+    תת-מקטע, כך שמספיק לבדוק אותן"""
+    local = _tabControls(table, halfLength, arc, connect, offset)
+    points = np.matmul(_bezierSplitMatrix(TAB_FIT_SPLITS), local[:, :, None])
+    u, v = points[..., 0], np.abs(points[..., 1])
+    limit = TAB_CLEARANCE * np.minimum(depth[:, None, None, None],
+                                       halfLength[:, None, None, None] - np.abs(u))
+    # בפינות המותר הוא 0 בדיוק, והעקומה יוצאת מהן על הצלע
+    inside = (v <= limit) | (v <= 1e-9)
+    return inside.reshape(len(table), -1).all(axis=1)
+
+
+def _fitTabs(table, halfLength, depth, arc, connect, offset):
+    """עותק של טבלת התפרים שבו כל לשונית שיוצאת מאזור התפר (_tabsInside)
+    מכווצת לעבר הלשונית הקבועה: size, shift, skew ו-jitter מוכפלים במקדם
+    שנמצא בחיפוש בינארי וקטורי לכל התפרים. לשונית שגם הצורה הקבועה שלה לא
+    נכנסת לאזור (תאים מוארכים מאוד) נשארת בצורה הקבועה"""
+    table = table.copy()
+    if not len(table):
+        # רשת 1x1 — אין תפרים פנימיים
+        return table
+    nominal = {"size": 1.0, "shift": 0.0, "skew": 0.0, "jitter": 0.0}
+    outside = np.flatnonzero(~_tabsInside(table, halfLength, depth, arc, connect, offset))
+    if not len(outside):
+        return table
+    drawn = table[outside]
+    args = [array[outside] for array in (halfLength, depth, arc, connect)]
+
+    def blend(t):
+        candidate = drawn.copy()
+        for name, value in nominal.items():
+            candidate[name] = value + t * (drawn[name] - value)
+        return candidate
+
+    low, high = np.zeros(len(outside)), np.ones(len(outside))
+    for _ in range(TAB_FIT_STEPS):
+        middle = (low + high) * 0.5
+        fits = _tabsInside(blend(middle), *args, offset)
+        low = np.where(fits, middle, low)
+        high = np.where(fits, high, middle)
+    table[outside] = blend(low)
+    return table
 
 
 class PieceInfo:
     """מחלקה לניהול מידע על חלקי הפאזל"""
-    def __init__(self, size, rowNum, colNum, ar=DEFAULT_ARC_RATIO, cr=DEFAULT_CONNECT_RATIO):
+    def __init__(self, size, rowNum, colNum, ar=DEFAULT_ARC_RATIO, cr=DEFAULT_CONNECT_RATIO,
+                 variation=None):
         self.w = size[0] / colNum
         self.h = size[1] / rowNum
         self.rowNum = rowNum
         self.colNum = colNum
         self.arcRatio = ar
         self.connectRatio = cr
+        # TabVariation — לשונית שונה לכל תפר (None — אותה לשונית בכל החלקים)
+        self.variation = variation
+        self._tabs = None
+        self._grid = None
 
     def getPieceInfo(self, row, col):
+        if self.variation is not None:
+            rects, centers, borders = self.grid()
+            return (tuple(rects[row, col].tolist()), tuple(centers[row, col].tolist()),
+                    borders[row, col].tolist())
         arcW = self.w * self.arcRatio
         arcH = self.h * self.arcRatio
         connectW = self.w * self.connectRatio
@@ -112,19 +411,140 @@ class PieceInfo:
             borders
         )
 
+    def grid(self):
+        """getPieceInfo לכל הרשת במעבר וקטורי אחד — (rects, centers, borders)
+        במערכים (rows, cols, 4) int32, (rows, cols, 2) float64 ו-(rows, cols, 4)
+        uint8, עם אותן פעולות בדיוק (ולכן אותן תוצאות) כמו לכל חלק בנפרד.
+        עם הווריאציה המערכים נשמרים (לקריאה בלבד), כי getPieceInfo נשען עליהם"""
+        if self._grid is not None:
+            return self._grid
+        rows = np.arange(self.rowNum)[:, None]
+        cols = np.arange(self.colNum)[None, :]
+        shape = (self.rowNum, self.colNum)
+
+        male = ((rows + cols) % 2 == 0)[..., None]
+        borders = np.where(male, np.array([t_FEMALE, t_MALE, t_FEMALE, t_MALE], np.uint8),
+                           np.array([t_MALE, t_FEMALE, t_MALE, t_FEMALE], np.uint8))
+        borders[:, 0, 1] = t_LINE
+        borders[0, :, 2] = t_LINE
+        borders[-1, :, 0] = t_LINE
+        borders[:, -1, 3] = t_LINE
+
+        if self.variation is not None:
+            self._grid = self._variedGrid(borders)
+            for array in self._grid:
+                array.setflags(write=False)
+            return self._grid
+
+        arcW = self.w * self.arcRatio
+        arcH = self.h * self.arcRatio
+        connectW = self.w * self.connectRatio
+        connectH = self.h * self.connectRatio
+
+        def adjust(side, male, female):
+            return np.where(borders[..., side] == t_MALE, male,
+                            np.where(borders[..., side] == t_FEMALE, female, 0.0))
+
+        # התאמות לפי סוג הקצה — הוספת 0.0 במקום "בלי שינוי" מדויקת
+        left = adjust(1, connectH - arcW, arcW)
+        top = adjust(2, connectW - arcH, arcH)
+        topX = np.broadcast_to(self.w * cols, shape) - left
+        topY = np.broadcast_to(self.h * rows, shape) - top
+        bottomX = self.w * (cols + 1) + adjust(3, connectH - arcW, arcW)
+        bottomY = self.h * (rows + 1) + adjust(0, connectW - arcH, arcH)
+        centerX = self.w * 0.5 + left
+        centerY = self.h * 0.5 + top
+
+        rects = np.rint(np.stack([topX, topY, bottomX, bottomY], axis=-1)).astype(np.int32)
+        return rects, np.stack([centerX, centerY], axis=-1), borders
+
+    def tabs(self):
+        """הלשוניות של כל התפרים הפנימיים עם הווריאציה — (table, kinds,
+        controls, offsets): טבלת הפרמטרים (TabVariation.seamTable, אחרי
+        _fitTabs), סוג הקצה של הבעלים (החלק העליון / השמאלי, בצלע התחתונה /
+        הימנית שלו), נקודות הבקרה (N, 4, 4, 2) סביב מרכז הבעלים ומרכז הבעלים (N, 2) בתמונה.
+        כל הלשוניות מחושבות בפעולות וקטוריות אחדות, ונשמרות"""
+        if self._tabs is not None:
+            return self._tabs
+        table = self.variation.seamTable(self.rowNum, self.colNum)
+        vertical = table["axis"] == 1
+        ownerRow = table["row"].astype(np.int64) - ~vertical
+        ownerCol = table["col"].astype(np.int64) - vertical
+
+        # סוג הקצה לפי דוגמת השחמט (חלק "זכר" — נקבה בתחתון וזכר בימני),
+        # והפוך בתפרים שהוגרל להם flip
+        male = (ownerRow + ownerCol) % 2 == 0
+        female = (male != vertical) != table["flip"]
+        kinds = np.where(female, t_FEMALE, t_MALE).astype(np.uint8)
+
+        # התפר האופקי הוא הצלע התחתונה (u לאורך x), האנכי — הימנית (u לאורך -y)
+        halfLength = np.where(vertical, self.h * 0.5, self.w * 0.5)
+        depth = np.where(vertical, self.w * 0.5, self.h * 0.5)
+        arc = np.where(vertical, self.w, self.h) * self.arcRatio
+        connect = np.where(vertical, self.h, self.w) * self.connectRatio
+        curveOffset = min(self.w, self.h) * 0.02
+        # לשוניות שיוצאות מאזור התפר שלהן מכווצות, כך שתפרים סמוכים לא נחתכים
+        table = _fitTabs(table, halfLength, depth, arc, connect, curveOffset)
+        local = _tabControls(table, halfLength, arc, connect, curveOffset)
+        u, v = local[..., 0], local[..., 1]
+        # זכר הוא שיקוף של הנקבה סביב קו הצלע
+        v = np.where((kinds == t_MALE)[:, None, None], -v, v)
+        vertical = vertical[:, None, None]
+        controls = np.stack([np.where(vertical, self.w * 0.5 + v, u),
+                             np.where(vertical, -u, self.h * 0.5 + v)], -1)
+        offsets = np.stack([(ownerCol + 0.5) * self.w, (ownerRow + 0.5) * self.h], -1)
+        self._tabs = table, kinds, controls, offsets
+        return self._tabs
+
+    def _variedGrid(self, borders):
+        """grid() עם הווריאציה: סוגי הקצוות מהתפרים, וה-rect הוא התא מורחב
+        לגבולות נקודות הבקרה של ארבעת התפרים (העקומה תמיד בתוכן)"""
+        table, kinds, controls, offsets = self.tabs()
+        rows, cols = self.rowNum, self.colNum
+        vertical = table["axis"] == 1
+        row = table["row"].astype(np.int64)
+        col = table["col"].astype(np.int64)
+        ownerRow, ownerCol = row - ~vertical, col - vertical
+        # הבעלים בצלע התחתונה / הימנית, השכן בעליונה / השמאלית עם הסוג המשלים
+        borders[ownerRow, ownerCol, np.where(vertical, 3, 0)] = kinds
+        borders[row, col, np.where(vertical, 1, 2)] = t_FEMALE + t_MALE - kinds
+
+        r, c = np.indices((rows, cols))
+        low = np.stack([c * self.w, r * self.h], -1)
+        high = np.stack([(c + 1) * self.w, (r + 1) * self.h], -1)
+        points = controls.reshape(len(table), 16, 2) + offsets[:, None]
+        seamLow, seamHigh = points.min(axis=1), points.max(axis=1)
+        for pieceRow, pieceCol in ((ownerRow, ownerCol), (row, col)):
+            np.minimum.at(low, (pieceRow, pieceCol), seamLow)
+            np.maximum.at(high, (pieceRow, pieceCol), seamHigh)
+
+        rects = np.concatenate([np.floor(low), np.ceil(high)], -1).astype(np.int32)
+        centers = np.stack([(c + 0.5) * self.w, (r + 0.5) * self.h], -1) - rects[..., :2]
+        return rects, centers, borders
+
 
 class PieceOutLine:
     """מחלקה ליצירת קווי מתאר של חלקי הפאזל"""
-    def __init__(self, width, height, ar=DEFAULT_ARC_RATIO, cr=DEFAULT_CONNECT_RATIO):
+    def __init__(self, width, height, ar=DEFAULT_ARC_RATIO, cr=DEFAULT_CONNECT_RATIO,
+                 tolerance=None):
         self.w = width
         self.h = height
         self.arcRatio = ar
         self.connectRatio = cr
         self.pointNum = DEFAULT_POINT_NUM
+        # None — pointNum נקודות לכל מקטע; אחרת דגימה אדפטיבית בסף פיקסלים זה
+        self.tolerance = tolerance
         # היסט סקלבילי לעקומת Bezier במקום ערך קבוע של 8
         self._curve_offset = min(width, height) * 0.02
 
-    def genRightFemaleArc(self, istop):
+    def _sample(self, segments):
+        """דגימת מקטעי בזייה (S, 4, 2) — קבועה או אדפטיבית לפי tolerance"""
+        if self.tolerance is None:
+            return computerBezierBatch(segments, self.pointNum)
+        return computerBezierAdaptive(segments, self.tolerance)
+
+    def _rightFemaleArcCtrl(self, istop):
+        """נקודות בקרה (4, 2) של קשת הכניסה לשקע הימני"""
         halfW = self.w * 0.5
         halfH = self.h * 0.5
         arcW = self.w * self.arcRatio
@@ -136,20 +556,19 @@ class PieceOutLine:
         dh = bottom[1] - top[1]
         offset = self._curve_offset
 
-        points = [
+        points = np.array([
             top,
             (top[0] + dw / 3 + offset, top[1] + dh / 3),
             (top[0] + 2 * dw / 3 + offset, top[1] + dh * 2 / 3),
             bottom
-        ]
+        ])
 
-        if not istop:
-            return computerBezier(points, self.pointNum)
-        else:
-            left = [(p[0], -p[1]) for p in reversed(points)]
-            return computerBezier(left, self.pointNum)
+        if istop:
+            points = points[::-1] * (1.0, -1.0)
+        return points
 
-    def genRightFemaleConnect(self, left):
+    def _rightFemaleConnectCtrl(self, left):
+        """נקודות בקרה (4, 2) של חצי הלשונית בשקע הימני"""
         halfW = self.w * 0.5
         arcW = self.w * self.arcRatio
         connectW = self.h * self.connectRatio
@@ -159,55 +578,67 @@ class PieceOutLine:
         endX = startX - connectW
         endY = 0
 
-        points = [
+        points = np.array([
             (startX, startY),
             (endX + (startX - endX) * 3 / 5, -startY * 2 / 3),
             (endX, 2 * startY),
             (endX, endY)
-        ]
+        ])
 
-        if not left:
-            return computerBezier(points, self.pointNum)
-        else:
-            left = [(p[0], -p[1]) for p in reversed(points)]
-            return computerBezier(left, self.pointNum)
+        if left:
+            points = points[::-1] * (1.0, -1.0)
+        return points
+
+    def genRightFemaleArc(self, istop):
+        return self._sample(self._rightFemaleArcCtrl(istop))
+
+    def genRightFemaleConnect(self, left):
+        return self._sample(self._rightFemaleConnectCtrl(left))
 
     def genRightFemale(self):
-        rightArc = self.genRightFemaleArc(False)
-        right = self.genRightFemaleConnect(False)
-        left = self.genRightFemaleConnect(True)
-        leftArc = self.genRightFemaleArc(True)
-        return rightArc + right + left + leftArc
+        # ארבעת המקטעים מחושבים בקריאה וקטורית אחת
+        return self._sample([
+            self._rightFemaleArcCtrl(False),
+            self._rightFemaleConnectCtrl(False),
+            self._rightFemaleConnectCtrl(True),
+            self._rightFemaleArcCtrl(True),
+        ])
+
+    def _rightMaleFrom(self, rightFemale):
+        halfW = self.w * 0.5
+        points = rightFemale.copy()
+        points[:, 0] += (halfW - points[:, 0]) * 2
+        return points
 
-    def genRightMale(self):
+    def _leftMaleFrom(self, rightFemale):
         halfW = self.w * 0.5
-        points = self.genRightFemale()
-        return [(p[0] + (halfW - p[0]) * 2, p[1]) for p in points]
+        points = rightFemale[::-1].copy()
+        points[:, 0] -= halfW * 2
+        return points
+
+    def _leftFemaleFrom(self, leftMale):
+        halfW = self.w * 0.5
+        points = leftMale.copy()
+        points[:, 0] += (-points[:, 0] - halfW) * 2
+        return points
+
+    def genRightMale(self):
+        return self._rightMaleFrom(self.genRightFemale())
 
     def genRightLine(self):
-        return [(self.w * 0.5, self.h * 0.5)]
+        return np.array([(self.w * 0.5, self.h * 0.5)])
 
     def genLeftMale(self):
-        halfW = self.w * 0.5
-        points = self.genRightFemale()
-        return list(reversed([(p[0] - halfW * 2, p[1]) for p in points]))
+        return self._leftMaleFrom(self.genRightFemale())
 
     def genLeftFemale(self):
-        halfW = self.w * 0.5
-        points = self.genLeftMale()
-        return [(((-p[0] - halfW) * 2 + p[0]), p[1]) for p in points]
+        return self._leftFemaleFrom(self.genLeftMale())
 
     def genLeftLine(self):
-        return [(-self.w * 0.5, -self.h * 0.5)]
-
-    def genBottomFemale(self):
-        rightArc = self.genBottomFemaleArc(False)
-        right = self.genBottomFemaleConnect(False)
-        left = self.genBottomFemaleConnect(True)
-        leftArc = self.genBottomFemaleArc(True)
-        return rightArc + right + left + leftArc
+        return np.array([(-self.w * 0.5, -self.h * 0.5)])
 
-    def genBottomFemaleArc(self, isLeft):
+    def _bottomFemaleArcCtrl(self, isLeft):
+        """נקודות בקרה (4, 2) של קשת הכניסה לשקע התחתון"""
         halfW = self.w * 0.5
         halfH = self.h * 0.5
         arcH = self.h * self.arcRatio
@@ -219,20 +650,19 @@ class PieceOutLine:
         dh = left[1] - right[1]
         offset = self._curve_offset
 
-        points = [
+        points = np.array([
             right,
             (right[0] - dw / 3, right[1] + dh / 3 + offset),
             (right[0] - 2 * dw / 3, right[1] + dh * 2 / 3 + offset),
             left
-        ]
+        ])
 
-        if not isLeft:
-            return computerBezier(points, self.pointNum)
-        else:
-            left = [(-p[0], p[1]) for p in reversed(points)]
-            return computerBezier(left, self.pointNum)
+        if isLeft:
+            points = points[::-1] * (-1.0, 1.0)
+        return points
 
-    def genBottomFemaleConnect(self, left):
+    def _bottomFemaleConnectCtrl(self, left):
+        """נקודות בקרה (4, 2) של חצי הלשונית בשקע התחתון"""
         halfH = self.h * 0.5
         arcH = self.h * self.arcRatio
         connectW = self.w * self.connectRatio
@@ -242,186 +672,1707 @@ class PieceOutLine:
         endX = 0
         endY = startY - connectW
 
-        points = [
+        points = np.array([
             (startX, startY),
             (-startX * 2 / 3, endY + (startY - endY) * 3 / 5),
             (2 * startX, endY),
             (endX, endY)
-        ]
+        ])
 
-        if not left:
-            return computerBezier(points, self.pointNum)
-        else:
-            left = [(-p[0], p[1]) for p in reversed(points)]
-            return computerBezier(left, self.pointNum)
+        if left:
+            points = points[::-1] * (-1.0, 1.0)
+        return points
 
-    def genBottomMale(self):
+    def genBottomFemaleArc(self, isLeft):
+        return self._sample(self._bottomFemaleArcCtrl(isLeft))
+
+    def genBottomFemaleConnect(self, left):
+        return self._sample(self._bottomFemaleConnectCtrl(left))
+
+    def genBottomFemale(self):
+        # ארבעת המקטעים מחושבים בקריאה וקטורית אחת
+        return self._sample([
+            self._bottomFemaleArcCtrl(False),
+            self._bottomFemaleConnectCtrl(False),
+            self._bottomFemaleConnectCtrl(True),
+            self._bottomFemaleArcCtrl(True),
+        ])
+
+    def _bottomMaleFrom(self, bottomFemale):
+        halfH = self.h * 0.5
+        points = bottomFemale.copy()
+        points[:, 1] += (halfH - points[:, 1]) * 2
+        return points
+
+    def _topMaleFrom(self, bottomFemale):
+        points = bottomFemale[::-1].copy()
+        points[:, 1] -= self.h
+        return points
+
+    def _topFemaleFrom(self, topMale):
         halfH = self.h * 0.5
-        points = self.genBottomFemale()
-        return [(p[0], (halfH - p[1]) * 2 + p[1]) for p in points]
+        points = topMale.copy()
+        points[:, 1] += (-points[:, 1] - halfH) * 2
+        return points
+
+    def genBottomMale(self):
+        return self._bottomMaleFrom(self.genBottomFemale())
 
     def genBottomLine(self):
-        return [(-self.w * 0.5, self.h * 0.5)]
+        return np.array([(-self.w * 0.5, self.h * 0.5)])
 
     def genTopMale(self):
-        points = self.genBottomFemale()
-        return list(reversed([(p[0], p[1] - self.h) for p in points]))
+        return self._topMaleFrom(self.genBottomFemale())
 
     def genTopFemale(self):
-        halfH = self.h * 0.5
-        points = self.genTopMale()
-        return [(p[0], (-p[1] - halfH) * 2 + p[1]) for p in points]
+        return self._topFemaleFrom(self.genTopMale())
 
     def genTopLine(self):
-        return [(self.w * 0.5, -self.h * 0.5)]
+        return np.array([(self.w * 0.5, -self.h * 0.5)])
+
+    def _buildEdgeTemplates(self):
+        """בניית כל וריאנטי הקצוות פעם אחת: שתי עקומות בסיס, השאר שיקופים שלהן"""
+        rightFemale = self.genRightFemale()
+        bottomFemale = self.genBottomFemale()
+        leftMale = self._leftMaleFrom(rightFemale)
+        topMale = self._topMaleFrom(bottomFemale)
+
+        templates = (
+            {t_FEMALE: bottomFemale, t_MALE: self._bottomMaleFrom(bottomFemale),
+             t_LINE: self.genBottomLine()},
+            {t_FEMALE: self._leftFemaleFrom(leftMale), t_MALE: leftMale,
+             t_LINE: self.genLeftLine()},
+            {t_FEMALE: self._topFemaleFrom(topMale), t_MALE: topMale,
+             t_LINE: self.genTopLine()},
+            {t_FEMALE: rightFemale, t_MALE: self._rightMaleFrom(rightFemale),
+             t_LINE: self.genRightLine()},
+        )
+        for side in templates:
+            for points in side.values():
+                points.setflags(write=False)
+        return templates
+
+    def edgeControls(self):
+        """נקודות הבקרה של אותם וריאנטי קצוות — מערך (S, 4, 2) של מקטעי בזייה
+        מעוקבים לכל סוג קצה (ל-LINE אין מקטעים), לפי אותם שיקופים כמו
+        _buildEdgeTemplates: השיקופים פועלים על כל נקודה בנפרד, ולכן חלים גם
+        על נקודות בקרה (היפוך הסדר הופך גם את כיוון כל מקטע)"""
+        rightFemale = np.concatenate([
+            self._rightFemaleArcCtrl(False), self._rightFemaleConnectCtrl(False),
+            self._rightFemaleConnectCtrl(True), self._rightFemaleArcCtrl(True),
+        ])
+        bottomFemale = np.concatenate([
+            self._bottomFemaleArcCtrl(False), self._bottomFemaleConnectCtrl(False),
+            self._bottomFemaleConnectCtrl(True), self._bottomFemaleArcCtrl(True),
+        ])
+        leftMale = self._leftMaleFrom(rightFemale)
+        topMale = self._topMaleFrom(bottomFemale)
+        line = np.empty((0, 4, 2))
+
+        return tuple({kind: points.reshape(-1, 4, 2) for kind, points in side.items()}
+                     for side in (
+            {t_FEMALE: bottomFemale, t_MALE: self._bottomMaleFrom(bottomFemale), t_LINE: line},
+            {t_FEMALE: self._leftFemaleFrom(leftMale), t_MALE: leftMale, t_LINE: line},
+            {t_FEMALE: self._topFemaleFrom(topMale), t_MALE: topMale, t_LINE: line},
+            {t_FEMALE: rightFemale, t_MALE: self._rightMaleFrom(rightFemale), t_LINE: line},
+        ))
+
+    def edgeTemplates(self):
+        """תבניות הקצוות (תחתון, שמאלי, עליון, ימני) לפי סוג קצה — משותפות לכל
+        PieceOutLine עם אותה גאומטריה, ולכן נבנות פעם אחת לכל עבודה"""
+        key = (self.w, self.h, self.arcRatio, self.connectRatio,
+               self.pointNum, self.tolerance, self._curve_offset)
+        templates = _EDGE_TEMPLATE_CACHE.get(key)
+        if templates is None:
+            templates = self._buildEdgeTemplates()
+            if len(_EDGE_TEMPLATE_CACHE) >= EDGE_TEMPLATE_CACHE_SIZE:
+                _EDGE_TEMPLATE_CACHE.pop(next(iter(_EDGE_TEMPLATE_CACHE)))
+            _EDGE_TEMPLATE_CACHE[key] = templates
+        return templates
 
     def genOutLine(self, pieceBorders):
-        curvPoints = [(self.w * 0.5, self.h * 0.5)]
+        """קו המתאר של חלק שלם — מערך numpy בצורה (N, 2) סביב מרכז החלק"""
+        templates = self.edgeTemplates()
+        curvPoints = [np.array([(self.w * 0.5, self.h * 0.5)])]
+        for i, side in enumerate(templates):
+            curvPoints.append(side[pieceBorders[i]])
 
-        funcs = [
-            {t_FEMALE: self.genBottomFemale, t_MALE: self.genBottomMale, t_LINE: self.genBottomLine},
-            {t_FEMALE: self.genLeftFemale, t_MALE: self.genLeftMale, t_LINE: self.genLeftLine},
-            {t_FEMALE: self.genTopFemale, t_MALE: self.genTopMale, t_LINE: self.genTopLine},
-            {t_FEMALE: self.genRightFemale, t_MALE: self.genRightMale, t_LINE: self.genRightLine},
-        ]
-
-        for i, f in enumerate(funcs):
-            curvPoints.extend(f[pieceBorders[i]]())
+        return np.concatenate(curvPoints)
 
-        return curvPoints
 
+class Seam:
+    """תפר בין שני חלקים סמוכים (או קצה חיצוני) בקואורדינטות התמונה.
+    הנקודות נשמרות כתבנית קצה של החלק ה"בעלים" + היסט מרכזו, בכיוון
+    ההקפה של הבעלים: start כלול, end לא כלול (כמו בדגימת העקומות).
+    controls: נקודות הבקרה (S, 4, 2) של התבנית, לייצוא וקטורי
+    """
+    def __init__(self, template, offset, start, end, controls=None):
+        self.template = template
+        self.offset = offset
+        self.start = start
+        self.end = end
+        self.controls = controls
+
+    def beziers(self):
+        """מקטעי הבזייה המעוקבים של התפר (S, 4, 2) בקואורדינטות התמונה —
+        ריק בתפר ישר, שהוא פשוט הקו start -> end"""
+        return self.controls + self.offset
+
+    @property
+    def points(self):
+        return self.template + self.offset
+
+    def polyline(self):
+        """הקו המלא לציור — כולל שתי הפינות"""
+        return np.concatenate([[self.start], self.points, [self.end]])
+
+
+class SeamGraph:
+    """גרף התפרים של הפאזל: (rows+1) x cols תפרים אופקיים ו-rows x (cols+1)
+    אנכיים. כל תפר מחושב פעם אחת, והחלקים מפנים אליו לפי אינדקס וכיוון —
+    כך שני חלקים שכנים חולקים בדיוק את אותן נקודות.
+    עם info.variation לכל תפר פנימי תבנית משלו: כל הלשוניות נדגמות יחד
+    בקריאה אחת (computerBezierChains), ו-templates משמשות רק לשוליים
+    """
+    HORIZONTAL = 0
+    VERTICAL = 1
+
+    def __init__(self, info, outLine):
+        self.rowNum = info.rowNum
+        self.colNum = info.colNum
+        self.w = info.w
+        self.h = info.h
+        self.variation = info.variation
+        templates = outLine.edgeTemplates()
+        self.templates = templates
+        self.controls = outLine.edgeControls()
+        rows, cols = self.rowNum, self.colNum
+        borders = info.grid()[2]
+        varied = {}
+        if info.variation is not None:
+            table, _, controls, _ = info.tabs()
+            points = computerBezierChains(controls, outLine.pointNum, outLine.tolerance)
+            varied = {key: tab for key, tab in zip(
+                zip(table["axis"].tolist(), table["row"].tolist(), table["col"].tolist()),
+                zip(points, controls))}
+
+        # הבעלים של תפר פנימי הוא החלק העליון / השמאלי; תפרי שוליים שייכים
+        # לחלק היחיד שנוגע בהם
+        self.hSeams = [[None] * cols for _ in range(rows + 1)]
+        self.vSeams = [[None] * (cols + 1) for _ in range(rows)]
+        for c in range(cols):
+            for r in range(rows + 1):
+                if r > 0:
+                    owner, side = (r - 1, c), 0
+                else:
+                    owner, side = (0, c), 2
+                self.hSeams[r][c] = self._makeSeam(borders, templates, owner, side,
+                                                   varied.get((self.HORIZONTAL, r, c)))
+        for r in range(rows):
+            for c in range(cols + 1):
+                if c > 0:
+                    owner, side = (r, c - 1), 3
+                else:
+                    owner, side = (r, 0), 1
+                self.vSeams[r][c] = self._makeSeam(borders, templates, owner, side,
+                                                   varied.get((self.VERTICAL, r, c)))
+
+    def _makeSeam(self, borders, templates, owner, side, varied=None):
+        """varied: (נקודות, נקודות בקרה) של לשונית משתנה, במקום התבנית לפי סוג"""
+        row, col = owner
+        offset = ((col + 0.5) * self.w, (row + 0.5) * self.h)
+        # פינות הצלע לפי כיוון ההקפה: תחתון, שמאלי, עליון, ימני
+        x0, x1 = col * self.w, (col + 1) * self.w
+        y0, y1 = row * self.h, (row + 1) * self.h
+        start, end = [((x1, y1), (x0, y1)), ((x0, y1), (x0, y0)),
+                      ((x0, y0), (x1, y0)), ((x1, y0), (x1, y1))][side]
+        if varied is None:
+            kind = borders[row, col, side]
+            varied = templates[side][kind], self.controls[side][kind]
+        template, controls = varied
+        return Seam(template, offset, start, end, controls)
+
+    def pieceSeams(self, row, col):
+        """הפניות התפרים של חלק — (סוג, (שורה, עמודה), הפוך?) לפי הסדר
+        תחתון, שמאלי, עליון, ימני"""
+        return [
+            (self.HORIZONTAL, (row + 1, col), False),
+            (self.VERTICAL, (row, col), col > 0),
+            (self.HORIZONTAL, (row, col), row > 0),
+            (self.VERTICAL, (row, col + 1), False),
+        ]
 
-def polygonCropImage(im, polygon, name):
-    """חיתוך תמונה לפי פוליגון"""
-    imArray = np.asarray(im)
-    maskIm = Image.new('L', (imArray.shape[1], imArray.shape[0]), 0)
-    ImageDraw.Draw(maskIm).polygon(polygon, outline=1, fill=1)
-    mask = np.array(maskIm)
+    def seam(self, kind, index):
+        r, c = index
+        return self.hSeams[r][c] if kind == self.HORIZONTAL else self.vSeams[r][c]
+
+    def seams(self):
+        for row in self.hSeams:
+            yield from row
+        for row in self.vSeams:
+            yield from row
+
+    def localOutLine(self, borders):
+        """קו המתאר של חלק סביב מרכזו, ישירות מתבניות הקצוות — אותן פעולות
+        בדיוק כמו PieceOutLine.genOutLine, ולכן אותה מסכה עד הפיקסל. בלי
+        וריאציה בלבד (אז לכל החלקים עם אותם borders אותו קו מתאר)"""
+        curvPoints = [np.array([(self.w * 0.5, self.h * 0.5)])]
+        for side, kind in zip(self.templates, borders):
+            curvPoints.append(side[kind])
+        return np.concatenate(curvPoints)
+
+    def pieceOutLine(self, row, col, corners=False):
+        """קו המתאר של חלק בקואורדינטות התמונה, מורכב מהתפרים שלו.
+        corners: כולל את ארבע הפינות המדויקות (הדגימה הקבועה משמיטה את
+        נקודת הסיום של כל צלע — זניח במסכה בינארית, לא במסכה מוחלקת)
+        """
+        curvPoints = [np.array([((col + 1) * self.w, (row + 1) * self.h)])]
+        for kind, index, reverse in self.pieceSeams(row, col):
+            seam = self.seam(kind, index)
+            points = seam.polyline() if corners else seam.points
+            curvPoints.append(points[::-1] if reverse else points)
+        return np.concatenate(curvPoints)
+
+
+class PieceTable:
+    """טבלת הגאומטריה של כל החלקים במערכים רציפים, במקום tuple לכל חלק.
+    pieces: מערך רשומות (PIECE_DTYPE) לפי סדר שורות — row, col, rect, center,
+    borders, ו-start/count של קו המתאר בתוך vertices: מאגר (M, 2) float64 אחד
+    לכל קווי המתאר, בקואורדינטות התמונה (ריק אם נבנתה בלי SeamGraph). המאגר
+    מקובץ לפי צורת החלק, ולכן start אינו בהכרח לפי סדר השורות.
+    קווי המתאר זהים בדיוק ל-SeamGraph.pieceOutLine. נשמרת ל-.npz (בינארי)
+    או ל-.json (מערכים שטוחים, למשל למשחק בדפדפן) ונטענת עם load()
+    """
+    PIECE_DTYPE = np.dtype([
+        ("row", "<u2"), ("col", "<u2"), ("rect", "<i4", (4,)), ("center", "<f8", (2,)),
+        ("borders", "u1", (4,)), ("start", "<i8"), ("count", "<i4"),
+    ])
+
+    def __init__(self, size, rows, cols, pieces, vertices, corners=False):
+        self.size = tuple(size)
+        self.rows = rows
+        self.cols = cols
+        self.pieces = pieces
+        self.vertices = vertices
+        self.corners = corners
+
+    @classmethod
+    def fromGrid(cls, info, seamGraph=None, corners=False):
+        """בנייה במעבר וקטורי אחד על הרשת. seamGraph: None — בלי קווי מתאר;
+        corners: כולל פינות הצלעות (כמו pieceOutLine(..., corners=True))"""
+        rows, cols = info.rowNum, info.colNum
+        rects, centers, borders = info.grid()
+        pieces = np.zeros(rows * cols, cls.PIECE_DTYPE)
+        pieces["row"], pieces["col"] = [a.ravel() for a in np.indices((rows, cols))]
+        pieces["rect"] = rects.reshape(-1, 4)
+        pieces["center"] = centers.reshape(-1, 2)
+        pieces["borders"] = borders.reshape(-1, 4)
+        vertices = np.empty((0, 2))
+        if seamGraph is not None and seamGraph.variation is not None:
+            vertices = cls._variedOutlines(pieces, seamGraph, corners)
+        elif seamGraph is not None:
+            vertices = cls._outlines(pieces, borders, seamGraph, corners)
+        size = (round(info.w * cols), round(info.h * rows))
+        return cls(size, rows, cols, pieces, vertices, corners)
+
+    @classmethod
+    def build(cls, size, rows, cols, tolerance=None, corners=False,
+              arc_ratio=DEFAULT_ARC_RATIO, connect_ratio=DEFAULT_CONNECT_RATIO, variation=None):
+        """טבלה מלאה (כולל קווי מתאר) לתמונה בגודל size — בלי לטעון אותה.
+        variation: TabVariation — לשונית שונה לכל תפר"""
+        info, seamGraph = _classicGeometry(size, rows, cols, tolerance, arc_ratio, connect_ratio,
+                                           variation)
+        table = cls.fromGrid(info, seamGraph, corners)
+        table.size = tuple(size)
+        return table
+
+    @staticmethod
+    def _variedOutlines(pieces, seamGraph, corners):
+        """קווי המתאר כשלכל תפר צורה משלו — אין קבוצות של חלקים זהים, ולכן
+        כל חלק מורכב מהתפרים שלו לפי סדר השורות"""
+        outlines = [seamGraph.pieceOutLine(row, col, corners)
+                    for row, col in zip(pieces["row"].tolist(), pieces["col"].tolist())]
+        pieces["count"] = [len(outline) for outline in outlines]
+        pieces["start"] = np.cumsum(pieces["count"]) - pieces["count"]
+        return np.concatenate(outlines)
+
+    @staticmethod
+    def _outlines(pieces, borders, seamGraph, corners):
+        """כל קווי המתאר למאגר אחד. קו המתאר של חלק הוא פינה ואחריה ארבעה
+        תפרים (תחתון, שמאלי, עליון, ימני); כל תפר הוא תבנית + היסט הבעלים,
+        ותפר של שכן הפוך. חלקים עם אותן תבניות ואותם כיוונים מקובצים, וכל
+        קבוצה נכתבת ישירות לבלוק שלה במאגר: תבנית + היסט לכל תפר"""
+        rows, cols = seamGraph.rowNum, seamGraph.colNum
+        w, h = seamGraph.w, seamGraph.h
+        r = pieces["row"].astype(np.int64)
+        c = pieces["col"].astype(np.int64)
+        # לכל רכיב: האם התפר שייך לשכן (הפוך, בצלע sharedSide שלו), ואחרת
+        # לחלק עצמו בצלע ownSide — כמו הבעלים ב-SeamGraph
+        own = np.zeros(len(pieces), bool)
+        components = [
+            (own, r, c, 0, 0),              # תחתון — תמיד של החלק
+            (c > 0, r, c - 1, 3, 1),        # שמאלי — של השכן משמאל
+            (r > 0, r - 1, c, 0, 2),        # עליון — של השכן מעל
+            (own, r, c, 3, 3),              # ימני — תמיד של החלק
+        ]
+        parts = []
+        key = np.zeros(len(pieces), np.int64)
+        for reverse, ownerRow, ownerCol, sharedSide, ownSide in components:
+            ownerRow = np.where(reverse, ownerRow, r)
+            ownerCol = np.where(reverse, ownerCol, c)
+            side = np.where(reverse, sharedSide, ownSide)
+            kind = borders[ownerRow, ownerCol, side]
+            key = key * 32 + side * 8 + kind * 2 + reverse
+            parts.append((ownerRow, ownerCol, side, kind, reverse))
+
+        templates = seamGraph.templates
+        groups = np.unique(key, return_inverse=True)[1].ravel()
+        # המאגר מסודר לפי קבוצות — כל קבוצה היא בלוק (חלקים, נקודות, 2) רציף,
+        # ו-start/count מצביעים לתוכו
+        layouts = []
+        total = 0
+        for g in range(groups.max() + 1):
+            members = np.flatnonzero(groups == g)
+            first = members[0]
+            segments = []
+            for ownerRow, ownerCol, side, kind, reverse in parts:
+                template = templates[side[first]][kind[first]]
+                segments.append((template[::-1] if reverse[first] else template, side[first],
+                                 bool(reverse[first]), ownerRow[members], ownerCol[members]))
+            count = 1 + sum(len(points) + (2 if corners else 0) for points, *_ in segments)
+            pieces["start"][members] = total + np.arange(len(members)) * count
+            pieces["count"][members] = count
+            layouts.append((members, segments, total, count))
+            total += len(members) * count
+
+        vertices = np.empty((total, 2))
+        for members, segments, start, count in layouts:
+            block = vertices[start:start + len(members) * count].reshape(len(members), count, 2)
+            block[:, 0, 0] = (c[members] + 1) * w
+            block[:, 0, 1] = (r[members] + 1) * h
+            at = 1
+            for points, side, reverse, oRow, oCol in segments:
+                if corners:
+                    x0, x1 = oCol * w, (oCol + 1) * w
+                    y0, y1 = oRow * h, (oRow + 1) * h
+                    ends = [((x1, y1), (x0, y1)), ((x0, y1), (x0, y0)),
+                            ((x0, y0), (x1, y0)), ((x1, y0), (x1, y1))][side]
+                    if reverse:
+                        ends = ends[::-1]
+                    block[:, at] = np.stack(ends[0], -1)
+                    at += 1
+                # תבנית + היסט הבעלים — אותה פעולה כמו Seam.points
+                offset = np.stack([(oCol + 0.5) * w, (oRow + 0.5) * h], -1)
+                np.add(points[None], offset[:, None], out=block[:, at:at + len(points)])
+                at += len(points)
+                if corners:
+                    block[:, at] = np.stack(ends[1], -1)
+                    at += 1
+        return vertices
+
+    def __len__(self):
+        return len(self.pieces)
+
+    def index(self, row, col):
+        return row * self.cols + col
+
+    def outline(self, row, col):
+        """קו המתאר (N, 2) של חלק — מבט לתוך vertices"""
+        record = self.pieces[self.index(row, col)]
+        return self.vertices[record["start"]:record["start"] + record["count"]]
+
+    def save(self, path):
+        meta = {"size": list(self.size), "rows": self.rows, "cols": self.cols,
+                "corners": self.corners}
+        if path.endswith(".json"):
+            data = dict(meta, vertices=self.vertices.ravel().tolist())
+            data["pieces"] = {name: self.pieces[name].ravel().tolist()
+                              for name in self.PIECE_DTYPE.names}
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            return
+        np.savez_compressed(path, pieces=self.pieces, vertices=self.vertices,
+                            meta=np.array(json.dumps(meta)))
+
+    @classmethod
+    def load(cls, path):
+        if path.endswith(".json"):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            pieces = np.zeros(data["rows"] * data["cols"], cls.PIECE_DTYPE)
+            for name in cls.PIECE_DTYPE.names:
+                pieces[name] = np.reshape(data["pieces"][name], pieces[name].shape)
+            vertices = np.reshape(np.array(data["vertices"], dtype=np.float64), (-1, 2))
+        else:
+            with np.load(path) as data:
+                pieces, vertices = data["pieces"], data["vertices"]
+                data = json.loads(str(data["meta"]))
+        return cls(data["size"], data["rows"], data["cols"], pieces, vertices, data["corners"])
+
+
+def unlinkOutput(path):
+    """מחיקת קובץ פלט קיים לפני כתיבה מחדש. קבצים שחוזרו מ-PuzzleCache הם
+    hard links לרשומה שבמטמון, וכתיבה במקום (truncate) הייתה משנה גם אותה"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class EncoderConfig:
+    """הגדרות קידוד לקבצי החלקים — מאפשר להחליף גודל קובץ במהירות קידוד.
+    format: "png" | "webp" | "jpeg"
+    compress_level: רמת zlib ל-PNG (0-9, None — ברירת המחדל של Pillow)
+    optimize: מעבר אופטימיזציה נוסף (PNG/JPEG) — איטי יותר, קובץ קטן יותר
+    quality: איכות ל-WebP/JPEG (1-100); lossless: WebP ללא אובדן
+    method: מהירות מול דחיסה ב-WebP (0 — מהיר, 6 — איטי)
+    JPEG לא תומך בשקיפות, ולכן ערוץ ה-alpha נשמר לצדו כמסכת PNG נפרדת
+    ({name}_mask.png) — רק כשהחלק באמת שקוף בחלקו
+    """
+    EXTENSIONS = {"png": ".png", "webp": ".webp", "jpeg": ".jpg"}
+    MASK_SUFFIX = "_mask.png"
+
+    def __init__(self, format="png", compress_level=None, optimize=False,
+                 quality=95, lossless=False, method=4):
+        format = format.lower()
+        if format == "jpg":
+            format = "jpeg"
+        if format not in self.EXTENSIONS:
+            raise ValueError(f"unsupported export format: {format!r}")
+        if format == "webp" and not features.check("webp"):
+            raise ValueError("WebP export requires Pillow built with libwebp")
+        self.format = format
+        self.compress_level = compress_level
+        self.optimize = optimize
+        self.quality = quality
+        self.lossless = lossless
+        self.method = method
+
+    def filename(self, base):
+        return base + self.EXTENSIONS[self.format]
+
+    def saveOptions(self):
+        if self.format == "png":
+            options = {"optimize": self.optimize}
+            if self.compress_level is not None:
+                options["compress_level"] = self.compress_level
+            return options
+        if self.format == "webp":
+            return {"quality": self.quality, "lossless": self.lossless, "method": self.method}
+        return {"quality": self.quality, "optimize": self.optimize}
+
+    def encode(self, im):
+        """קידוד לזיכרון (bytes). ב-JPEG רק הצבע — בלי מסכת ה-alpha"""
+        buffer = io.BytesIO()
+        if self.format == "jpeg":
+            im = im.convert("RGB")
+        im.save(buffer, self.format.upper(), **self.saveOptions())
+        return buffer.getvalue()
+
+    def save(self, im, path):
+        unlinkOutput(path)
+        if self.format != "jpeg":
+            im.save(path, self.format.upper(), **self.saveOptions())
+            return
+        im.convert("RGB").save(path, "JPEG", **self.saveOptions())
+        if im.mode == "RGBA":
+            alpha = im.getchannel("A")
+            if alpha.getextrema() != (255, 255):
+                maskPath = os.path.splitext(path)[0] + self.MASK_SUFFIX
+                unlinkOutput(maskPath)
+                alpha.save(maskPath, "PNG", compress_level=1)
+
+
+DEFAULT_ENCODER = EncoderConfig()
+
+
+def coverageMask(size, polygon, subsamples=ANTIALIAS_SUBSAMPLES):
+    """מסכת 'L' מוחלקת: ערך כל פיקסל הוא שטח הכיסוי שלו ע"י הפוליגון.
+    כל שורת פיקסלים נדגמת ב-subsamples תת-שורות, ובכל תת-שורה הכיסוי
+    האופקי מדויק (חיתוך הצלע בקואורדינטה שברית). במקום לצבור מערך בגודל
+    החלק, רק התאים שבהם צלע חוצה תת-שורה מחושבים — ממוינים ומסוכמים
+    מצטבר (כלל winding, ולכן אין צורך למיין חיתוכים בכל שורה) — והמסכה
+    נבנית מריצות של ערך קבוע ביניהם.
+    polygon: רשימה שטוחה או מערך (N, 2); פיקסל (i, j) הוא הריבוע
+    [i, i+1) x [j, j+1), כך שחלקים סמוכים משלימים זה את זה לאטימות מלאה
+    """
+    width, height = size
+    s = subsamples
+    points = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    x0, y0 = points[:, 0], points[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+
+    # התת-שורות k שכל צלע חוצה: ymin <= (k + 0.5) / s < ymax
+    k0 = np.clip(np.ceil(np.minimum(y0, y1) * s - 0.5), 0, height * s)
+    k1 = np.clip(np.ceil(np.maximum(y0, y1) * s - 0.5), 0, height * s)
+    counts = (k1 - k0).astype(np.intp)
+    edge = np.repeat(np.arange(len(points)), counts)
+    k = k0[edge] + (np.arange(edge.size) - (np.cumsum(counts) - counts)[edge])
+
+    ex0, ey0 = x0[edge], y0[edge]
+    x = np.clip(ex0 + ((k + 0.5) / s - ey0) * (x1[edge] - ex0) / (y1[edge] - ey0), 0, width)
+    direction = np.where(y1 > y0, 1.0, -1.0)[edge]
+    xi = np.floor(x).astype(np.intp)
+    fx = x - xi
+
+    # מדרגה בנקודה x מחולקת בין הפיקסל שבו היא נופלת לזה שאחריו
+    stride = width + 2
+    index = (k // s).astype(np.intp) * stride + xi
+    index = np.concatenate([index, index + 1])
+    weight = np.concatenate([direction * (1.0 - fx), direction * fx])
+    order = np.argsort(index, kind="stable")
+    index = index[order]
+    total = np.cumsum(weight[order])
+    last = np.append(index[1:] != index[:-1], True)
+    values = (np.minimum(np.abs(total[last]), s) * (255.0 / s) + 0.5).astype(np.uint8)
+
+    runs = np.diff(np.concatenate([[0], index[last], [height * stride]]))
+    flat = np.repeat(np.concatenate([[0], values]).astype(np.uint8), runs)
+    return Image.frombuffer('L', size, flat, 'raw', 'L', stride, 1)
+
+
+def maskPolygon(im, polygon, antialias=False):
+    """מיסוך תמונה לפי פוליגון — מחזיר RGBA שבו מחוץ לפוליגון שקוף.
+    המסכה מצוירת ישירות בערכים 0/255 ומוצמדת כערוץ alpha במקום — בלי
+    העתקות של התמונה ובלי מכפלה זמנית. שים לב: im (RGBA) משתנה במקום
+    antialias: alpha לפי שטח כיסוי (ראה coverageMask) במקום קצוות בינאריים
+    """
+    if im.mode != "RGBA":
+        im = im.convert("RGBA")
+    if antialias:
+        maskIm = coverageMask(im.size, polygon)
+    else:
+        maskIm = Image.new('L', im.size, 0)
+        ImageDraw.Draw(maskIm).polygon(polygon, outline=255, fill=255)
+    im.putalpha(maskIm)
+    return im
 
-    newImArray = np.empty(imArray.shape, dtype='uint8')
-    newImArray[:, :, :3] = imArray[:, :, :3]
-    newImArray[:, :, 3] = mask * 255
 
-    newIm = Image.fromarray(newImArray, "RGBA")
-    newIm.save(name)
+def polygonCropImage(im, polygon, name, encoder=None, antialias=False):
+    """חיתוך תמונה לפי פוליגון ושמירה לקובץ (ראה maskPolygon).
+    encoder: EncoderConfig לשמירה (None — PNG בהגדרות ברירת המחדל)
+    """
+    (encoder or DEFAULT_ENCODER).save(maskPolygon(im, polygon, antialias), name)
 
 
-def createPuzzlePieces(image_input, rows, cols, output_prefix):
-    """פונקציה ראשית ליצירת חלקי פאזל קלאסיים.
-    image_input: נתיב לקובץ תמונה (str) או אובייקט PIL Image
+class OutlineLayer:
+    """שכבת קווי מתאר משותפת לשתי תמונות התצוגה המקדימה.
+    כל קו מתאר נמתח כפוליגון סגור על מסכת 'L' בדגימת-יתר, ומוקטן פעם אחת
+    בסוף — כך מתקבלים קווים חלקים בלי לצבור נקודות ובלי ציור לכל נקודה
     """
-    if isinstance(image_input, str):
-        im = Image.open(image_input).convert("RGBA")
-    else:
-        im = image_input.convert("RGBA")
+    def __init__(self, size, width, scale=OUTLINE_SUPERSAMPLE, zoom=1.0):
+        """size: גודל התצוגה המקדימה; zoom: יחס בינה לבין קואורדינטות התמונה"""
+        self.size = size
+        self.scale = scale
+        self.factor = zoom * scale
+        self.width = max(1, int(round(width * self.factor)))
+        self._mask = Image.new('L', (size[0] * scale, size[1] * scale), 0)
+        self._draw = ImageDraw.Draw(self._mask)
+
+    def _thin(self, points):
+        """השמטת נקודות שקרובות מחצי עובי הקו לנקודה שנשמרה לפניהן.
+        joint="curve" מצייר עיגול בכל נקודה, ובעקומות של 300 נקודות למקטע
+        רובן נופלות באותו פיקסל; עם פסיעה של חצי עובי הקו סטיית המיתר
+        זניחה ביחס לעובי עצמו"""
+        if len(points) <= 2:
+            return points
+        step = max(1.0, self.width / 2)
+        lengths = np.hypot(*np.diff(points, axis=0).T)
+        bucket = np.floor(np.concatenate([[0.0], np.cumsum(lengths)]) / step)
+        keep = np.concatenate([[True], bucket[1:] != bucket[:-1]])
+        keep[-1] = True
+        return points[keep]
+
+    def addPolyline(self, points):
+        """הוספת קו פתוח — points: מערך (N, 2) בקואורדינטות התמונה"""
+        points = self._thin(np.asarray(points) * self.factor)
+        self._draw.line(points.ravel().tolist(), fill=255, width=self.width, joint="curve")
+
+    def addPolygon(self, points):
+        """הוספת קו מתאר סגור — points: מערך (N, 2) בקואורדינטות התמונה"""
+        points = np.asarray(points) * self.factor
+        closed = self._thin(np.concatenate([points, points[:1]]))
+        self._draw.line(closed.ravel().tolist(), fill=255, width=self.width, joint="curve")
+
+    def mask(self):
+        if self.scale == 1:
+            return self._mask
+        return self._mask.reduce(self.scale)
+
+    def render(self, im):
+        """מחזיר (outline_only, outline_with_image) מאותה מסכה.
+        im הוא בסיס התצוגה בגודל size, והקווים מודבקים עליו במקום
+        """
+        return self.compose(self.mask(), im)
+
+    @staticmethod
+    def compose(mask, im):
+        """(outline_only, outline_with_image) ממסכה מוכנה — ראה render"""
+        outline_only = Image.new('RGBA', im.size, (0, 0, 0, 0))
+        outline_only.putalpha(mask)
+        im.paste((0, 0, 0, 255), (0, 0), mask)
+        return outline_only, im
+
+
+class ImageSource:
+    """מקור תמונה שנטען במלואו לזיכרון כ-RGBA"""
+    streaming = False
+
+    def __init__(self, image_input):
+        if isinstance(image_input, str):
+            self._image = Image.open(image_input).convert("RGBA")
+        else:
+            self._image = image_input.convert("RGBA")
+        self.size = self._image.size
 
-    arcRatio = DEFAULT_ARC_RATIO
-    connectRatio = DEFAULT_CONNECT_RATIO
-    # רדיוס הנקודות סקלבילי לפי גודל התמונה
-    r = max(2, int(min(im.size[0], im.size[1]) / 500))
+    def band(self, top, bottom):
+        """מחזיר (תמונה, היסט y) שמכילה את השורות [top, bottom) — כאן פשוט
+        התמונה כולה, בלי העתקה"""
+        return self._image, 0
 
-    info = PieceInfo(im.size, rows, cols, arcRatio, connectRatio)
-    outLine = PieceOutLine(im.size[0] / cols, im.size[1] / rows, arcRatio, connectRatio)
+    def preview(self):
+        """מחזיר (בסיס לתצוגה מקדימה, יחס הקטנה). הבסיס שייך למקור ונצרך
+        פעם אחת בסוף העבודה"""
+        return self._image, 1.0
 
-    w = im.size[0] / cols
-    h = im.size[1] / rows
 
-    outLinePoints = []
+# גודל פיקסל בבתים לפי rawmode — קבצים לא דחוסים שאפשר למפות לזיכרון
+_RAW_PIXEL_SIZE = {"L": 1, "RGB": 3, "BGR": 3, "RGBA": 4, "RGBX": 4, "BGRA": 4, "BGRX": 4}
 
-    for i in range(rows):
-        for j in range(cols):
-            rect, center, borders = info.getPieceInfo(i, j)
-            name = f"{output_prefix}{i}_{j}"
 
-            region = im.crop(rect)
-            curvPoints = outLine.genOutLine(borders)
+class ImageBandSource:
+    """מקור תמונה שנקרא ברצועות שורות לפי דרישה (מצב streaming).
+    קבצים לא דחוסים (TIFF/BMP/PPM) ממופים לזיכרון ורק השורות המבוקשות
+    נקראות מהדיסק; פורמטים דחוסים מפוענחים פעם אחת בפורמט המקורי (בלי
+    המרה ל-RGBA ובלי העתקות), וההמרה נעשית רצועה-רצועה
+    """
+    streaming = True
 
-            cropPoints = [(p[0] + center[0], p[1] + center[1]) for p in curvPoints]
-            polygonCropImage(region, cropPoints, f"{name}.png")
+    def __init__(self, image_input):
+        if isinstance(image_input, str):
+            self._image = Image.open(image_input)
+            self._raw = self._mapRaw(image_input, self._image)
+        else:
+            self._image = image_input
+            self._raw = None
+        self.size = self._image.size
+
+    @staticmethod
+    def _mapRaw(path, im):
+        """מיפוי זיכרון של נתוני הפיקסלים — None אם הקובץ דחוס או מפוצל"""
+        tiles = im.tile
+        if not tiles or any(t[0] != "raw" for t in tiles):
+            return None
+        args = tiles[0][3]
+        rawmode, stride, orientation = (args, 0, 1) if isinstance(args, str) else (tuple(args) + (0, 1))[:3]
+        if rawmode not in _RAW_PIXEL_SIZE:
+            return None
+        width, height = im.size
+        stride = stride or width * _RAW_PIXEL_SIZE[rawmode]
+        # כמה strips מותרים רק אם הם רציפים בקובץ
+        offset = tiles[0][2]
+        for tile in tiles:
+            x0, y0, x1, y1 = tile[1]
+            if (x0, x1) != (0, width) or tile[2] != offset + y0 * stride:
+                return None
+        data = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(height, stride))
+        return data, im.mode, rawmode, stride, orientation
+
+    def band(self, top, bottom):
+        """מחזיר (רצועת RGBA ברוחב מלא עם השורות [top, bottom), top)"""
+        width, height = self.size
+        top, bottom = max(0, top), min(height, bottom)
+        if self._raw is None:
+            return self._image.crop((0, top, width, bottom)).convert("RGBA"), top
+
+        data, mode, rawmode, stride, orientation = self._raw
+        if orientation < 0:
+            rows = data[height - bottom:height - top]
+        else:
+            rows = data[top:bottom]
+        band = Image.frombuffer(mode, (width, bottom - top), np.ascontiguousarray(rows),
+                                "raw", rawmode, stride, orientation)
+        return band.convert("RGBA"), top
+
+    def preview(self):
+        """בסיס תצוגה מקדימה מוקטן בפקטור שלם, נבנה רצועה-רצועה"""
+        width, height = self.size
+        k = max(1, -(-max(width, height) // STREAM_PREVIEW_MAX))
+        preview = Image.new("RGBA", (-(-width // k), -(-height // k)))
+        step = k * STREAM_PREVIEW_BAND
+        for top in range(0, height, step):
+            band, _ = self.band(top, top + step)
+            preview.paste(band.reduce(k) if k > 1 else band, (0, top // k))
+        return preview, 1.0 / k
+
+
+def fileStamp(path):
+    """(mtime_ns, size) של קובץ — משתנה כשהקובץ נכתב מחדש"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def openImageSource(image_input, stream=False):
+    """image_input: נתיב לקובץ תמונה (str), אובייקט PIL Image או מקור קיים"""
+    if isinstance(image_input, (ImageSource, ImageBandSource)):
+        return image_input
+    return ImageBandSource(image_input) if stream else ImageSource(image_input)
+
+
+class PuzzlePiece:
+    """חלק פאזל שנוצר בזיכרון.
+    image: תמונת RGBA של החלק (None אם sink כתב אותו בתהליך עובד)
+    rect: תיבת החלק בתמונת המקור (x0, y0, x1, y1) — יכולה לחרוג מהתמונה
+    center: מרכז התא ביחס לפינת ה-rect; borders: סוגי הקצוות לפי הסדר
+    תחתון, שמאלי, עליון, ימני; path: הקובץ שנכתב, אם נכתב
+    timings: משך כל שלב שהחלק עבר בשניות (geometry, mask / slice, write) —
+    נמדד תמיד, גם בתהליכי עובדים, ונאסף ע"י Profiler
+    """
+    def __init__(self, row, col, image, rect, center, borders):
+        self.row = row
+        self.col = col
+        self.image = image
+        self.rect = rect
+        self.center = center
+        self.borders = borders
+        self.path = None
+        self.timings = {}
+
+    def tobytes(self):
+        """פיקסלי RGBA גולמיים"""
+        return self.image.tobytes()
+
+    def encode(self, encoder=None):
+        """קידוד החלק ל-bytes (PNG כברירת מחדל) — למשל לתשובת HTTP"""
+        return (encoder or DEFAULT_ENCODER).encode(self.image)
+
+
+class FileSink:
+    """sink ברירת המחדל — קובץ לכל חלק ({prefix}{row}_{col}.{ext}).
+    אין לו מצב משותף, ולכן עם pool הוא רץ בתוך תהליכי העובדים: הקידוד
+    נעשה במקביל ורק המטא-דאטה של החלק חוזר לתהליך הראשי.
+    sink הוא כל אובייקט עם write(piece) ו-close(); parallel=True מסמן שאפשר
+    להריץ אותו בעובדים (חייב להיות pickle-able), ו-abort(cells) אופציונלי
+    מוחק את מה שנכתב לתאים (row, col) האלה כשהעבודה מבוטלת
+    """
+    parallel = True
+
+    def __init__(self, output_prefix, encoder=None):
+        self.prefix = output_prefix
+        self.encoder = encoder or DEFAULT_ENCODER
+
+    def path(self, row, col):
+        return self.encoder.filename(f"{self.prefix}{row}_{col}")
+
+    def write(self, piece):
+        path = self.path(piece.row, piece.col)
+        self.encoder.save(piece.image, path)
+        piece.path = path
+
+    def close(self):
+        pass
+
+    def abort(self, cells):
+        """מחיקת קבצי החלקים (והמסכות של JPEG) — השמות דטרמיניסטיים, ולכן
+        גם חלקים שנכתבו בתהליכי עובדים נמחקים"""
+        for row, col in cells:
+            path = self.path(row, col)
+            for name in (path, os.path.splitext(path)[0] + EncoderConfig.MASK_SUFFIX):
+                if os.path.exists(name):
+                    os.remove(name)
+
+
+class AtlasWriter:
+    """אריזת כל החלקים לגיליונות טקסטורה ({prefix}atlas_{k}) ואינדקס JSON
+    אחד ({prefix}atlas.json) במקום קובץ לכל חלק.
+    האריזה היא מדפים (shelf) לפי סדר ההגעה, ולכן דטרמיניסטית; גיליון שהתמלא
+    נשמר מיד, כך שבזיכרון נמצא גיליון אחד בכל רגע.
+    האינדקס מכיל לכל חלק: מיקום בגיליון, מיקום במקור (offset), מרכז החלק
+    ביחס לפינתו, סוגי הקצוות והשכנים (תחתון, שמאלי, עליון, ימני).
+    זהו sink: נכתב בתהליך הראשי בלבד, כי הגיליון משותף לכל החלקים
+    """
+    parallel = False
+
+    def __init__(self, output_prefix, image_size, rows, cols, encoder=None,
+                 maxSize=ATLAS_MAX_SIZE, padding=ATLAS_PADDING):
+        self.prefix = output_prefix
+        self.encoder = encoder or DEFAULT_ENCODER
+        self.maxSize = maxSize
+        self.padding = padding
+        self.index = {"version": 1, "image_size": list(image_size),
+                      "rows": rows, "cols": cols, "sheets": [], "pieces": []}
+        self._sheet = None
+        self._x = self._y = self._shelfH = 0
+        self._usedW = self._usedH = 0
+
+    def _newSheet(self):
+        self._flush()
+        self._sheet = Image.new("RGBA", (self.maxSize, self.maxSize), (0, 0, 0, 0))
+        self._x = self._y = self._shelfH = 0
+        self._usedW = self._usedH = 0
+
+    def _flush(self):
+        if self._sheet is None:
+            return
+        sheet = self._sheet.crop((0, 0, max(1, self._usedW), max(1, self._usedH)))
+        name = self.encoder.filename(f"{self.prefix}atlas_{len(self.index['sheets'])}")
+        self.encoder.save(sheet, name)
+        self.index["sheets"].append(os.path.basename(name))
+        self._sheet = None
+
+    def write(self, piece):
+        row, col, image = piece.row, piece.col, piece.image
+        w, h = image.size
+        if w > self.maxSize or h > self.maxSize:
+            raise ValueError(f"piece {row}_{col} ({w}x{h}) is larger than the atlas sheet")
+        if self._sheet is None:
+            self._newSheet()
+        if self._x + w > self.maxSize:
+            self._x = 0
+            self._y += self._shelfH + self.padding
+            self._shelfH = 0
+        if self._y + h > self.maxSize:
+            self._newSheet()
+
+        self._sheet.paste(image, (self._x, self._y))
+        rows, cols = self.index["rows"], self.index["cols"]
+        neighbors = [(row + 1, col), (row, col - 1), (row - 1, col), (row, col + 1)]
+        self.index["pieces"].append({
+            "row": row, "col": col,
+            "sheet": len(self.index["sheets"]),
+            "rect": [self._x, self._y, w, h],
+            "offset": [piece.rect[0], piece.rect[1]],
+            "center": [piece.center[0], piece.center[1]],
+            "borders": list(piece.borders),
+            "neighbors": [[r, c] if 0 <= r < rows and 0 <= c < cols else None
+                          for r, c in neighbors],
+        })
+        self._usedW = max(self._usedW, self._x + w)
+        self._usedH = max(self._usedH, self._y + h)
+        self._shelfH = max(self._shelfH, h)
+        self._x += w + self.padding
+
+    def close(self):
+        self._flush()
+        unlinkOutput(f"{self.prefix}atlas.json")
+        with open(f"{self.prefix}atlas.json", "w", encoding="utf-8") as f:
+            json.dump(self.index, f, separators=(",", ":"))
+
+    def abort(self, cells):
+        """מחיקת הגיליונות שכבר נכתבו; האינדקס נכתב רק ב-close"""
+        self._sheet = None
+        folder = os.path.dirname(self.prefix)
+        for name in self.index["sheets"]:
+            path = os.path.join(folder, name)
+            for name in (path, os.path.splitext(path)[0] + EncoderConfig.MASK_SUFFIX):
+                if os.path.exists(name):
+                    os.remove(name)
+        self.index["sheets"] = []
+
+
+def loadAtlasSheet(path):
+    """גיליון אטלס אחד כ-RGBA — כולל ערוץ ה-alpha של גיליון JPEG, ששמור
+    במסכה נפרדת"""
+    sheet = Image.open(path).convert("RGBA")
+    maskPath = os.path.splitext(path)[0] + EncoderConfig.MASK_SUFFIX
+    if os.path.exists(maskPath):
+        sheet.putalpha(Image.open(maskPath))
+    return sheet
+
+
+def loadAtlas(index_path):
+    """קריאת אטלס — מחזיר (אינדקס, גנרטור של (רשומת חלק, תמונת החלק))"""
+    with open(index_path, encoding="utf-8") as f:
+        index = json.load(f)
+    folder = os.path.dirname(index_path)
+
+    def pieces():
+        sheets = {}
+        for entry in index["pieces"]:
+            sheet = sheets.get(entry["sheet"])
+            if sheet is None:
+                sheets.clear()
+                sheet = loadAtlasSheet(os.path.join(folder, index["sheets"][entry["sheet"]]))
+                sheets[entry["sheet"]] = sheet
+            x, y, w, h = entry["rect"]
+            yield entry, sheet.crop((x, y, x + w, y + h))
+
+    return index, pieces()
+
+
+class Profiler:
+    """מכשור אופציונלי ל-createPuzzlePieces / create_rectangular_pieces.
+    אוסף אירועים מובנים (מילונים) ב-events:
+      לכל חלק — {"stage", "row", "col", "seconds"} לכל שלב ב-piece.timings,
+      ו-"bytes" בשלב write כשהחלק נכתב לקובץ;
+      לכל שלב כללי (open, setup, close, preview, save) — {"stage", "seconds"},
+      "bytes" לקבצים שנכתבו, ועם allocations=True גם הקצאות זיכרון נטו ושיא
+      ב-Python (tracemalloc — מאט את הריצה, ולכן כבוי כברירת מחדל).
+    on_event: קולבק אופציונלי לכל אירוע ברגע שנרשם.
+    בלי profiler לא נאסף דבר מעבר ל-piece.timings (שתי קריאות שעון לשלב)
+    """
+    def __init__(self, allocations=False, on_event=None):
+        self.allocations = allocations
+        self.on_event = on_event
+        self.events = []
+
+    def _emit(self, event):
+        self.events.append(event)
+        if self.on_event is not None:
+            self.on_event(event)
+
+    @contextmanager
+    def span(self, stage, paths=()):
+        """מדידת שלב כללי; paths: קבצים שהשלב כותב, לספירת הבתים"""
+        started = False
+        if self.allocations:
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            event = {"stage": stage, "seconds": time.perf_counter() - start}
+            if paths:
+                event["bytes"] = sum(os.path.getsize(path) for path in paths
+                                     if os.path.exists(path))
+            if self.allocations:
+                current, peak = tracemalloc.get_traced_memory()
+                event["alloc_bytes"] = current - before
+                event["alloc_peak"] = peak - before
+                if started:
+                    tracemalloc.stop()
+            self._emit(event)
+
+    def piece(self, piece):
+        """רישום זמני השלבים של חלק שהושלם"""
+        for stage, seconds in piece.timings.items():
+            event = {"stage": stage, "row": piece.row, "col": piece.col, "seconds": seconds}
+            if stage == "write" and piece.path is not None and os.path.exists(piece.path):
+                event["bytes"] = os.path.getsize(piece.path)
+            self._emit(event)
+
+    def summary(self):
+        """סיכום לפי שלב, לפי סדר ההופעה: {stage: {"count", "seconds", "bytes"}}"""
+        totals = {}
+        for event in self.events:
+            total = totals.setdefault(event["stage"], {"count": 0, "seconds": 0.0, "bytes": 0})
+            total["count"] += 1
+            total["seconds"] += event["seconds"]
+            total["bytes"] += event.get("bytes", 0)
+        return totals
+
+    def save(self, path):
+        """שמירת האירועים כ-JSON Lines"""
+        with open(path, "w", encoding="utf-8") as f:
+            for event in self.events:
+                f.write(json.dumps(event) + "\n")
+
+
+class _NullProfiler:
+    """Profiler כבוי — בלי מדידות ובלי הקצאות"""
+    _span = nullcontext()
+
+    def span(self, stage, paths=()):
+        return self._span
+
+    def piece(self, piece):
+        pass
+
+
+_NULL_PROFILER = _NullProfiler()
+
+
+class PuzzleCancelled(Exception):
+    """העבודה בוטלה דרך cancel — החלקים שכבר נכתבו נמחקו"""
+
+
+class Progress:
+    """מצב ההתקדמות שנשלח לקולבק progress אחרי כל חלק שהושלם.
+    bytes: נפח קבצי החלקים שנכתבו (באטלס הגיליונות נכתבים בסוף ולא נספרים)
+    """
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.bytes = 0
+        self._start = time.perf_counter()
+
+    def update(self, piece):
+        self.done += 1
+        if piece.path is not None and os.path.exists(piece.path):
+            self.bytes += os.path.getsize(piece.path)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    @property
+    def fraction(self):
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def eta(self):
+        """הערכת השניות שנותרו לפי הקצב עד עכשיו (None לפני החלק הראשון)"""
+        if not self.done:
+            return None
+        return self.elapsed * (self.total - self.done) / self.done
+
+
+def _gridCells(rows, cols):
+    return [(row, col) for row in range(rows) for col in range(cols)]
+
+
+def _drivePieces(pieces, sink, cells, profiler, progress=None, cancel=None):
+    """צריכת זרם החלקים של createPuzzlePieces / create_rectangular_pieces:
+    רישום בפרופיילר, דיווח התקדמות ובדיקת ביטול בין חלק לחלק.
+    בביטול (או שגיאה) הגנרטור נסגר — חוטי הכתיבה ועובדי ה-pool מסיימים את
+    מה שכבר רץ — ואז sink.abort מוחק את כל מה שנכתב, כך שלא נשאר סט חלקי"""
+    state = Progress(len(cells))
+    try:
+        for piece in pieces:
+            profiler.piece(piece)
+            if progress is not None:
+                state.update(piece)
+                progress(state)
+            if cancel is not None and cancel.is_set():
+                raise PuzzleCancelled(f"cancelled after {state.done} of {state.total} pieces")
+    except BaseException:
+        pieces.close()
+        abort = getattr(sink, "abort", None)
+        if abort is not None:
+            abort(cells)
+        raise
+
+
+def _renderPiece(im, piece, rect, cropPoints, antialias=False, timings=None):
+    """חיתוך אזור החלק ומיסוך לפי קו המתאר — זהה במסלול הטורי ובמקבילי.
+    piece: (row, col, rect, center, borders) במקור; rect: התיבה ביחס ל-im"""
+    start = time.perf_counter()
+    if antialias:
+        region = maskPolygon(im.crop(rect), cropPoints, antialias)
+    else:
+        region = maskPolygon(im.crop(rect), np.asarray(cropPoints).ravel().tolist())
+    result = PuzzlePiece(piece[0], piece[1], region, *piece[2:])
+    if timings is not None:
+        result.timings = timings
+    result.timings["mask"] = time.perf_counter() - start
+    return result
+
+
+def _writePiece(sink, piece):
+    start = time.perf_counter()
+    sink.write(piece)
+    piece.timings["write"] = time.perf_counter() - start
+    return piece
+
+
+# התמונה המשותפת בתהליך עובד — (שם, SharedMemory, תמונה); מתחברים מחדש רק
+# כשהמשימה מפנה לבלוק זיכרון אחר (למשל רצועה חדשה במצב streaming)
+_worker_source = None
+
+
+def _attachSharedImage(shm_name, size):
+    global _worker_source
+    if _worker_source is None or _worker_source[0] != shm_name:
+        if _worker_source is not None:
+            shm = _worker_source[1]
+            _worker_source = None
+            shm.close()
+        shm = shared_memory.SharedMemory(name=shm_name)
+        image = Image.frombuffer("RGBA", size, shm.buf, "raw", "RGBA", 0, 1)
+        _worker_source = (shm_name, shm, image)
+    return _worker_source[2]
+
+
+def _renderPieceChunk(shm_name, size, sink, jobs):
+    im = _attachSharedImage(shm_name, size)
+    pieces = []
+    for job in jobs:
+        piece = _renderPiece(im, *job)
+        if sink is not None:
+            _writePiece(sink, piece)
+            piece.image = None
+        pieces.append(piece)
+    return pieces
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class PipelineConfig:
+    """תצורת הצינור בתוך התהליך: גאומטריה -> רסטריזציה -> קידוד/כתיבה.
+    כל שלב רץ בחוטים משלו ומחזיק לכל היותר queueSize חלקים בטיפול, כך
+    שקלט/פלט חופף לעבודת CPU (Pillow משחרר את ה-GIL בציור ובקידוד) והזיכרון
+    נשאר חסום. sink שאינו parallel נכתב תמיד בחוט אחד ולפי הסדר
+    """
+    def __init__(self, rasterThreads=1, writeThreads=1, queueSize=16):
+        if rasterThreads < 1 or writeThreads < 1 or queueSize < 1:
+            raise ValueError("pipeline threads and queue size must be positive")
+        self.rasterThreads = rasterThreads
+        self.writeThreads = writeThreads
+        self.queueSize = queueSize
+
+
+def _orderedMap(func, items, threads, queueSize):
+    """map עצל ב-threads חוטים עם חלון חסום: הקלט נצרך רק כשיש מקום בחלון
+    (backpressure), והתוצאות מוחזרות לפי סדר הקלט"""
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        window = deque()
+        for item in items:
+            if len(window) >= queueSize:
+                yield window.popleft().result()
+            window.append(executor.submit(func, item))
+        while window:
+            yield window.popleft().result()
+
+
+def _pipelineStages(items, raster, sink, pipeline):
+    """חיבור שלבי raster ו-write (אם יש sink) מעל זרם משימות עצל"""
+    if pipeline is None:
+        pieces = map(raster, items)
+    else:
+        pieces = _orderedMap(raster, items, pipeline.rasterThreads, pipeline.queueSize)
+    if sink is None:
+        return pieces
 
-            for p in curvPoints:
-                outLinePoints.append((p[0] + j * w + 0.5 * w,
-                                      p[1] + i * h + 0.5 * h))
+    def write(piece):
+        return _writePiece(sink, piece)
 
-    # שמירת תמונת outline ריקה
-    outline_empty = Image.new('RGBA', im.size, (255, 255, 255, 0))
-    outLinedraw = ImageDraw.Draw(outline_empty)
+    if pipeline is None:
+        return map(write, pieces)
+    threads = pipeline.writeThreads if getattr(sink, "parallel", False) else 1
+    return _orderedMap(write, pieces, threads, pipeline.queueSize)
 
-    for p in outLinePoints:
-        px, py = p
-        outLinedraw.ellipse((px - r, py - r, px + r, py + r),
-                            fill=(0, 0, 0, 255), outline=(0, 0, 0, 255))
 
-    outline_empty.save(f"{output_prefix}outline_only.png")
+class RenderPool:
+    """pool תהליכים לרינדור חלקים. התמונה משותפת לעובדים דרך shared memory
+    ולא נשלחת (pickle) לכל משימה. אפשר להעביר pool אחד לכמה עבודות
+    (createPuzzlePieces(..., pool=...)) כדי לשמור את התהליכים חמים
+    """
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+
+    def render(self, im, jobs, sink=None):
+        """רינדור זרם (piece, rect, cropPoints) — גנרטור של PuzzlePiece לפי
+        הסדר. המשימות נצרכות בעצלות ורק מספר חסום של מנות נמצא בטיפול.
+        sink (עם parallel=True) נכתב בעובדים, והחלקים חוזרים בלי תמונה"""
+        imArray = np.asarray(im)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, imArray.nbytes))
+        window = deque()
+        try:
+            np.ndarray(imArray.shape, dtype=np.uint8, buffer=shm.buf)[...] = imArray
+            del imArray
+            for chunk in _chunks(jobs, RENDER_CHUNK):
+                if len(window) >= self.workers * 2:
+                    yield from window.popleft().result()
+                window.append(self._executor.submit(_renderPieceChunk, shm.name, im.size,
+                                                    sink, chunk))
+            while window:
+                yield from window.popleft().result()
+        finally:
+            # יציאה מוקדמת (ביטול / חריגה): מנות שלא התחילו מבוטלות, ואלו שרצות
+            # מסתיימות לפני שהזיכרון המשותף משתחרר — אף עובד לא כותב אחרי החזרה
+            for future in window:
+                future.cancel()
+            wait(window)
+            shm.close()
+            shm.unlink()
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _shiftRect(rect, dy):
+    return (rect[0], rect[1] - dy, rect[2], rect[3] - dy)
+
+
+def _classicGeometry(size, rows, cols, tolerance=None, arcRatio=DEFAULT_ARC_RATIO,
+                     connectRatio=DEFAULT_CONNECT_RATIO, variation=None):
+    info = PieceInfo(size, rows, cols, arcRatio, connectRatio, variation)
+    outLine = PieceOutLine(size[0] / cols, size[1] / rows, arcRatio, connectRatio, tolerance)
+    return info, SeamGraph(info, outLine)
+
+
+def _classicBands(source, info, seamGraph, antialias=False, cells=None):
+    """שלב הגאומטריה: מניב (תמונה, משימות) בעצלות — משימה היא
+    (piece, rect ביחס לתמונה, נקודות החיתוך, antialias, timings). במצב streaming כל
+    שורת חלקים מקבלת רצועה משלה; אחרת כל המשימות חולקות את התמונה המלאה.
+    cells: קבוצת (row, col) — רק החלקים האלה (None — כולם), לפי סדר שורות"""
+    rows, cols = info.rowNum, info.colNum
+    w, h = info.w, info.h
+    size = np.array(source.size)
+    cells = None if cells is None else frozenset(cells)
+    bandRows = range(rows) if cells is None else sorted({i for i, _ in cells})
+    # rect / center / borders של כל הרשת במעבר אחד (בלי קווי המתאר — אלה
+    # נבנים לכל חלק בתורו, כדי שהזיכרון לא יגדל עם מספר החלקים)
+    pieces = PieceTable.fromGrid(info).pieces
+    rects, centers, allBorders = (pieces[name].tolist() for name in ("rect", "center", "borders"))
+
+    def rowJobs(i):
+        for j in range(cols):
+            if cells is not None and (i, j) not in cells:
+                continue
+            start = time.perf_counter()
+            k = i * cols + j
+            rect, center, borders = tuple(rects[k]), tuple(centers[k]), allBorders[k]
+            offset = (j * w + 0.5 * w, i * h + 0.5 * h)
+            if antialias:
+                curvPoints = seamGraph.pieceOutLine(i, j, corners=True)
+                # ה-rect המעוגל יכול לחתוך עד חצי פיקסל מקצות הלשוניות, ובמסכה
+                # מוחלקת גם לפיקסלים האלה יש כיסוי — מרחיבים לכל פיקסל שקו
+                # המתאר נוגע בו (בתוך התמונה), והמרכז זז בהתאם
+                low = np.maximum(np.floor(curvPoints.min(axis=0)), 0).astype(int).tolist()
+                high = np.minimum(np.ceil(curvPoints.max(axis=0)), size).astype(int).tolist()
+                grown = (min(rect[0], low[0]), min(rect[1], low[1]),
+                         max(rect[2], high[0]), max(rect[3], high[1]))
+                center = (center[0] + rect[0] - grown[0], center[1] + rect[1] - grown[1])
+                rect = grown
+                # במסכה מוחלקת הנקודות יחסיות לפינת ה-rect השלמה בדיוק, כדי
+                # שהכיסוי בתפר יתחלק בין שני החלקים בלי פער של שבר פיקסל
+                cropPoints = curvPoints - rect[:2]
+            elif seamGraph.variation is not None:
+                cropPoints = seamGraph.pieceOutLine(i, j) - offset + center
+            else:
+                # המעבר לקואורדינטות התמונה וחזרה משנה את הנקודות בשבר של
+                # ביט, ובמסכה בינארית זה מספיק כדי להזיז פיקסל בקצה לשונית
+                cropPoints = seamGraph.localOutLine(borders) + center
+            timings = {"geometry": time.perf_counter() - start}
+            yield (i, j, rect, center, borders), rect, cropPoints, antialias, timings
+
+    if not source.streaming:
+        band, _ = source.band(0, source.size[1])
+        yield band, (job for i in bandRows for job in rowJobs(i))
+        return
+
+    for i in bandRows:
+        jobs = list(rowJobs(i))
+        band, dy = source.band(min(job[1][1] for job in jobs), max(job[1][3] for job in jobs))
+        yield band, [(piece, _shiftRect(rect, dy), *rest) for piece, rect, *rest in jobs]
+
+
+def _rasterizeJob(item):
+    band, job = item
+    return _renderPiece(band, *job)
+
+
+def _iterClassicPieces(source, info, seamGraph, workers=None, pool=None, sink=None,
+                       pipeline=None, antialias=False, cells=None):
+    rows, cols = info.rowNum, info.colNum
+    ownPool = pool is None and bool(workers and workers > 1 and rows * cols > 1)
+    if ownPool:
+        pool = RenderPool(workers)
+    try:
+        if pool is None:
+            bands = _classicBands(source, info, seamGraph, antialias, cells)
+            items = ((band, job) for band, jobs in bands for job in jobs)
+            yield from _pipelineStages(items, _rasterizeJob, sink, pipeline)
+            return
+
+        # sink שאפשר להריץ בעובדים נכתב שם, אחרת בתהליך הראשי
+        workerSink = sink if getattr(sink, "parallel", False) else None
+        pieces = (piece for band, jobs in _classicBands(source, info, seamGraph, antialias, cells)
+                  for piece in pool.render(band, jobs, workerSink))
+        if sink is not None and workerSink is None:
+            yield from _pipelineStages(pieces, lambda piece: piece, sink, pipeline)
+        else:
+            yield from pieces
+    finally:
+        if ownPool:
+            pool.close()
+
+
+def iterPuzzlePieces(image_input, rows, cols, workers=None, stream=False, pool=None, sink=None,
+                     pipeline=None, tolerance=None, antialias=False, cells=None, variation=None):
+    """גנרטור של חלקי פאזל קלאסיים (PuzzlePiece) לפי סדר שורות — החלקים
+    נוצרים בעצלות ונשארים בזיכרון, בלי קבצים זמניים.
+    sink: אופציונלי — נכתב עם כל חלק (ראה FileSink); הקריאה ל-close() על
+    אחריות הקורא
+    pipeline: PipelineConfig — שלבי raster/write בחוטים עם תורים חסומים
+    tolerance: דגימה אדפטיבית של העקומות (ראה createPuzzlePieces)
+    antialias: ערוץ alpha מוחלק בקצוות (ראה createPuzzlePieces)
+    cells: קבוצת (row, col) — רק החלקים האלה (None — כולם)
+    variation: TabVariation — צורות לשוניות אקראיות (ראה createPuzzlePieces)
+    """
+    source = openImageSource(image_input, stream)
+    info, seamGraph = _classicGeometry(source.size, rows, cols, tolerance, variation=variation)
+    yield from _iterClassicPieces(source, info, seamGraph, workers, pool, sink, pipeline,
+                                  antialias, cells)
 
-    # יצירת outline עם התמונה
-    outline_with_image = im.copy()
-    outLinedraw = ImageDraw.Draw(outline_with_image)
 
-    for p in outLinePoints:
-        px, py = p
-        outLinedraw.ellipse((px - r, py - r, px + r, py + r),
-                            fill=(0, 0, 0, 255), outline=(0, 0, 0, 255))
+def _classicOutlineMask(source, seamGraph, previewSize, zoom):
+    """מסכת 'L' של קווי המתאר בגודל התצוגה המקדימה — כל תפר מצויר פעם אחת"""
+    size = source.size
+    # עובי קו המתאר סקלבילי לפי גודל התמונה
+    r = max(2, int(min(size[0], size[1]) / 500))
 
-    outline_with_image.save(f"{output_prefix}outline_with_image.png")
+    outlineLayer = OutlineLayer(previewSize, 2 * r, zoom=zoom)
+    for seam in seamGraph.seams():
+        outlineLayer.addPolyline(seam.polyline())
+    return outlineLayer.mask()
 
-    return outline_with_image
 
+def _classicOutline(source, seamGraph, preview=None):
+    """תמונות התצוגה המקדימה (outline_only, outline_with_image) של פאזל קלאסי.
+    צורכת את בסיס התצוגה של המקור, או preview — (בסיס, יחס הקטנה) חלופי"""
+    base, zoom = preview or source.preview()
+    # תמונות outline — ריקה ועם התמונה — משכבה אחת משותפת
+    return OutlineLayer.compose(_classicOutlineMask(source, seamGraph, base.size, zoom), base)
 
-def create_rectangular_pieces(image_input, rows, cols, output_prefix):
-    """יצירת חלקי פאזל מלבניים פשוטים.
+
+def createPuzzlePieces(image_input, rows, cols, output_prefix, workers=None, stream=False,
+                       pool=None, encoder=None, atlas=False, sink=None, pipeline=None,
+                       tolerance=None, antialias=False, profiler=None, progress=None,
+                       cancel=None, variation=None):
+    """פונקציה ראשית ליצירת חלקי פאזל קלאסיים.
     image_input: נתיב לקובץ תמונה (str) או אובייקט PIL Image
+    workers: מספר תהליכים לרינדור החלקים (None/1 — טורי)
+    stream: קריאת התמונה ברצועות שורות — הזיכרון פרופורציונלי לשורת חלקים
+            אחת, והתצוגות המקדימות נוצרות בגודל מוקטן
+    pool: RenderPool קיים לשימוש חוזר (גובר על workers, ולא נסגר בסוף)
+    encoder: EncoderConfig לקבצי החלקים (None — PNG בהגדרות ברירת המחדל)
+    atlas: אריזת החלקים לגיליונות טקסטורה + atlas.json במקום קובץ לכל חלק
+    sink: יעד מותאם לחלקים (write/close) במקום קבצים או אטלס
+    pipeline: PipelineConfig — חפיפה בין רסטריזציה לקידוד/כתיבה בחוטים
+    tolerance: סף שגיאה בפיקסלים לדגימה אדפטיבית של העקומות (למשל
+               DEFAULT_TOLERANCE); None — DEFAULT_POINT_NUM נקודות לכל מקטע
+    antialias: alpha לפי שטח הכיסוי של כל פיקסל בקצה החלק, במקום 0/255 —
+               קצוות חלקים, וחלקים סמוכים משלימים זה את זה בדיוק לאטימות מלאה
+    profiler: Profiler לאיסוף זמנים לפי חלק ולפי שלב (None — כבוי)
+    progress: קולבק שנקרא עם Progress אחרי כל חלק (מהחוט הקורא)
+    cancel: threading.Event — כשהוא נקבע העבודה נעצרת בין חלקים, הקבצים
+            שנכתבו נמחקים ונזרק PuzzleCancelled
+    variation: TabVariation — כיוון, גודל, מיקום ואסימטריה שונים ללשונית של
+               כל תפר, משוחזרים מ-seed (None — אותה לשונית בכל החלקים)
     """
-    if isinstance(image_input, str):
-        image = Image.open(image_input).convert("RGBA")
-    else:
-        image = image_input.convert("RGBA")
+    profiler = profiler or _NULL_PROFILER
+    with profiler.span("open"):
+        source = openImageSource(image_input, stream)
+    size = source.size
+    if sink is None:
+        sink = (AtlasWriter(output_prefix, size, rows, cols, encoder) if atlas
+                else FileSink(output_prefix, encoder))
+
+    with profiler.span("setup"):
+        info, seamGraph = _classicGeometry(size, rows, cols, tolerance, variation=variation)
+
+    pieces = _iterClassicPieces(source, info, seamGraph, workers, pool, sink, pipeline,
+                                antialias)
+    _drivePieces(pieces, sink, _gridCells(rows, cols), profiler, progress, cancel)
+    with profiler.span("close"):
+        sink.close()
+
+    return _savePreviews(output_prefix, lambda: _classicOutline(source, seamGraph), profiler)
+
+
+def _savePreviews(output_prefix, outline, profiler):
+    """ציור (outline) ושמירה של שתי תמונות התצוגה המקדימה — מחזיר את זו עם התמונה"""
+    with profiler.span("preview"):
+        outline_empty, outline_with_image = outline()
+    paths = (f"{output_prefix}outline_only.png", f"{output_prefix}outline_with_image.png")
+    with profiler.span("save", paths):
+        for path in paths:
+            unlinkOutput(path)
+        outline_empty.save(paths[0])
+        outline_with_image.save(paths[1])
+    return outline_with_image
 
-    width, height = image.size
+
+def _paintBorders(pixels, rowBounds, colBounds, width=2):
+    """מסגרת שחורה ברוחב width בשולי כל תא ברשת, ישירות במערך (H, W, 4) —
+    השמה אחת לכל שורות המסגרת ואחת לכל העמודות, במקום ציור לכל חלק"""
+    def edges(bounds):
+        return sorted({p for start, end in bounds
+                       for p in (*range(start, start + width), *range(end - width, end))
+                       if start <= p < end})
+    pixels[edges(rowBounds)] = (0, 0, 0, 255)
+    pixels[:, edges(colBounds)] = (0, 0, 0, 255)
+
+
+def _pixelArray(band):
+    """עותק RGBA כתיב של רצועה במערך (H, W, 4), עם שורת ריפוד אחת בסוף:
+    Pillow דורש stride * גובה בתים מתחילת כל מבט, גם בשורה האחרונה"""
+    width, height = band.size
+    pixels = np.empty((height + 1, width, 4), dtype=np.uint8)
+    # העתקה ישירה לזיכרון המערך דרך תמונה ממופה — מהיר בהרבה מ-np.asarray,
+    # שעובר דרך tobytes. המיפוי כתיב כי המערך שלנו
+    target = Image.frombuffer("RGBA", (width, height), pixels, "raw", "RGBA", 0, 1)
+    target.readonly = 0
+    target.paste(band.convert("RGBA") if band.mode != "RGBA" else band, (0, 0))
+    return pixels
+
+
+def _pixelView(pixels, left, top, right, bottom):
+    """תמונת RGBA שממופה על מלבן בתוך המערך, בלי העתקה (לקריאה בלבד)"""
+    stride = pixels.shape[1] * 4
+    start = top * stride + left * 4
+    data = pixels.reshape(-1)[start:start + (bottom - top) * stride]
+    return Image.frombuffer("RGBA", (right - left, bottom - top), data, "raw", "RGBA", stride, 1)
+
+
+def _rectangularPiece(item):
+    start = time.perf_counter()
+    pixels, dy, i, j, rect = item
+    left, top, right, bottom = rect
+    piece = _pixelView(pixels, left, top - dy, right, bottom - dy)
+    result = PuzzlePiece(i, j, piece, rect, ((right - left) / 2, (bottom - top) / 2), [t_LINE] * 4)
+    result.timings["slice"] = time.perf_counter() - start
+    return result
+
+
+def _gridBounds(size, rows, cols):
+    """גבולות השורות והעמודות של הרשת — [(start, end)] בפיקסלים שלמים"""
+    width, height = size
     # חלוקה עם float לכיסוי מלא של הפיקסלים
     piece_width = width / cols
     piece_height = height / rows
+    rowBounds = [(round(i * piece_height), round((i + 1) * piece_height)) for i in range(rows)]
+    colBounds = [(round(j * piece_width), round((j + 1) * piece_width)) for j in range(cols)]
+    return rowBounds, colBounds
+
+
+def _gridPixels(source, rows, cols):
+    """מערך הפיקסלים של התמונה המלאה עם מסגרות הרשת (לא במצב streaming).
+    עותק יחיד — המקור נשאר נקי לתצוגה המקדימה"""
+    rowBounds, colBounds = _gridBounds(source.size, rows, cols)
+    band, _ = source.band(0, source.size[1])
+    pixels = _pixelArray(band)
+    _paintBorders(pixels[:-1], rowBounds, colBounds)
+    return pixels
+
+
+def _rectangularItems(source, rows, cols, cells=None, pixels=None):
+    """משימות החיתוך (pixels, dy, i, j, rect) בעצלות. pixels: מערך מוכן של
+    _gridPixels לשימוש חוזר (None — נבנה כאן, או רצועה לכל שורה ב-streaming)"""
+    rowBounds, colBounds = _gridBounds(source.size, rows, cols)
+    cells = None if cells is None else frozenset(cells)
+    dy = 0
+    if not source.streaming and pixels is None:
+        pixels = _gridPixels(source, rows, cols)
+    for i, (top, bottom) in enumerate(rowBounds):
+        if cells is not None and not any((i, j) in cells for j in range(cols)):
+            continue
+        if source.streaming:
+            band, dy = source.band(top, bottom)
+            pixels = _pixelArray(band)
+            _paintBorders(pixels[:-1], [(top - dy, bottom - dy)], colBounds)
+        for j, (left, right) in enumerate(colBounds):
+            if cells is None or (i, j) in cells:
+                yield pixels, dy, i, j, (left, top, right, bottom)
+
+
+def iterRectangularPieces(image_input, rows, cols, stream=False, sink=None, pipeline=None,
+                          cells=None):
+    """גנרטור של חלקים מלבניים (PuzzlePiece) לפי סדר שורות, בזיכרון.
+    התמונה מומרת למערך אחד (או מערך לכל רצועה במצב streaming), המסגרות
+    נצבעות בו בבת אחת, והחלקים הם מבטים לתוכו — בלי העתקה לכל חלק.
+    cells: קבוצת (row, col) — רק החלקים האלה (None — כולם)
+    """
+    source = openImageSource(image_input, stream)
+    items = _rectangularItems(source, rows, cols, cells)
+    yield from _pipelineStages(items, _rectangularPiece, sink, pipeline)
 
-    for i in range(rows):
-        for j in range(cols):
-            left = round(j * piece_width)
-            top = round(i * piece_height)
-            right = round((j + 1) * piece_width)
-            bottom = round((i + 1) * piece_height)
-
-            piece = image.crop((left, top, right, bottom))
-            draw = ImageDraw.Draw(piece)
-            draw.rectangle([(0, 0), (right - left - 1, bottom - top - 1)],
-                           outline=(0, 0, 0), width=2)
 
-            piece.save(f"{output_prefix}{i}_{j}.png")
+def _gridOutlineMask(source, rows, cols, previewSize, zoom):
+    """מסכת 'L' של קווי הרשת המלבנית בגודל התצוגה המקדימה"""
+    width, height = source.size
+    piece_width = width / cols
+    piece_height = height / rows
 
-    # יצירת תמונת outline עם התמונה
-    preview = image.copy()
-    draw = ImageDraw.Draw(preview)
+    line_width = max(1, round(2 * zoom))
+    mask = Image.new('L', previewSize, 0)
+    draw = ImageDraw.Draw(mask)
 
     for i in range(rows + 1):
-        y = round(i * piece_height)
-        draw.line([(0, y), (width, y)], fill=(0, 0, 0), width=2)
+        y = round(i * piece_height) * zoom
+        draw.line([(0, y), (width * zoom, y)], fill=255, width=line_width)
 
     for j in range(cols + 1):
-        x = round(j * piece_width)
-        draw.line([(x, 0), (x, height)], fill=(0, 0, 0), width=2)
+        x = round(j * piece_width) * zoom
+        draw.line([(x, 0), (x, height * zoom)], fill=255, width=line_width)
+    return mask
 
-    preview.save(f"{output_prefix}outline_with_image.png")
 
-    # יצירת גרסה ריקה עם קווים בלבד
-    empty_preview = Image.new('RGBA', image.size, (255, 255, 255, 0))
-    draw = ImageDraw.Draw(empty_preview)
+def _gridCompose(mask, preview):
+    """(outline_only, outline_with_image) ממסכת הרשת — הקווים מודבקים על
+    שכבה ריקה ועל preview במקום"""
+    empty_preview = Image.new('RGBA', preview.size, (255, 255, 255, 0))
+    empty_preview.paste((0, 0, 0, 255), (0, 0), mask)
+    preview.paste((0, 0, 0, 255), (0, 0), mask)
+    return empty_preview, preview
 
-    for i in range(rows + 1):
-        y = round(i * piece_height)
-        draw.line([(0, y), (width, y)], fill=(0, 0, 0), width=2)
 
-    for j in range(cols + 1):
-        x = round(j * piece_width)
-        draw.line([(x, 0), (x, height)], fill=(0, 0, 0), width=2)
+def _gridOutline(source, rows, cols, preview=None):
+    """תמונות התצוגה המקדימה (outline_only, outline_with_image) של רשת מלבנים.
+    צורכת את בסיס התצוגה של המקור, או preview (ראה _classicOutline)"""
+    # קווי הרשת מצוירים פעם אחת על מסכה, ומודבקים דרכה על שתי התמונות
+    preview, zoom = preview or source.preview()
+    return _gridCompose(_gridOutlineMask(source, rows, cols, preview.size, zoom), preview)
 
-    empty_preview.save(f"{output_prefix}outline_only.png")
 
-    return preview
+def create_rectangular_pieces(image_input, rows, cols, output_prefix, stream=False,
+                              encoder=None, atlas=False, sink=None, pipeline=None,
+                              profiler=None, progress=None, cancel=None):
+    """יצירת חלקי פאזל מלבניים פשוטים.
+    image_input: נתיב לקובץ תמונה (str) או אובייקט PIL Image
+    stream: קריאת התמונה ברצועות שורות (ראה createPuzzlePieces)
+    encoder: EncoderConfig לקבצי החלקים (None — PNG בהגדרות ברירת המחדל)
+    atlas: אריזת החלקים לגיליונות טקסטורה (ראה createPuzzlePieces)
+    sink: יעד מותאם לחלקים (write/close) במקום קבצים או אטלס
+    pipeline: PipelineConfig — חפיפה בין חיתוך לקידוד/כתיבה בחוטים
+    profiler: Profiler לאיסוף זמנים (ראה createPuzzlePieces)
+    progress, cancel: דיווח התקדמות וביטול בין חלקים (ראה createPuzzlePieces)
+    """
+    profiler = profiler or _NULL_PROFILER
+    with profiler.span("open"):
+        source = openImageSource(image_input, stream)
+    if sink is None:
+        sink = (AtlasWriter(output_prefix, source.size, rows, cols, encoder) if atlas
+                else FileSink(output_prefix, encoder))
+
+    pieces = iterRectangularPieces(source, rows, cols, sink=sink, pipeline=pipeline)
+    _drivePieces(pieces, sink, _gridCells(rows, cols), profiler, progress, cancel)
+    with profiler.span("close"):
+        sink.close()
+
+    return _savePreviews(output_prefix, lambda: _gridOutline(source, rows, cols), profiler)
+
+
+class PuzzleSession:
+    """סשן עבודה על תמונה אחת — לכוונון אינטראקטיבי של הפאזל.
+    התמונה נטענת ומומרת ל-RGBA פעם אחת, ונשמרים בין קריאות: גרף התפרים
+    לכל (rows, cols, יחסים, tolerance), מערך הפיקסלים עם המסגרות של הרשת
+    המלבנית האחרונה, בסיס התצוגה המקדימה ומסכות קווי המתאר האחרונות.
+    כך שינוי של rows/cols מחשב רק פריסה חדשה (התבניות נשמרות ב-
+    _EDGE_TEMPLATE_CACHE לפי גאומטריית החלק), שינוי יחסי הקשתות מחשב רק את
+    העקומות, ו-cells מרנדר רק את החלקים המבוקשים.
+    במטמון התצוגה נשמרות מסכות 'L' בלבד (בית לפיקסל) ולא זוגות RGBA מלאים,
+    ובסיס התצוגה של ImageSource הוא התמונה עצמה, בלי עותק נוסף
+    """
+    def __init__(self, image_input, stream=False):
+        self.image_input = image_input
+        # חותמת הקובץ (mtime_ns, size) בזמן הפתיחה — None לתמונה בזיכרון.
+        # מאפשרת לזהות שהקובץ השתנה מאז שהסשן פענח אותו
+        self.stamp = fileStamp(image_input) if isinstance(image_input, str) else None
+        self.source = openImageSource(image_input, stream)
+        self.size = self.source.size
+        self._geometry = {}
+        self._outlines = {}
+        self._gridPixels = None
+        self._preview = None
+
+    @staticmethod
+    def _remember(cache, size, key, build):
+        value = cache.get(key)
+        if value is None:
+            value = build()
+            if len(cache) >= size:
+                cache.pop(next(iter(cache)))
+            cache[key] = value
+        return value
+
+    def geometry(self, rows, cols, arc_ratio=DEFAULT_ARC_RATIO,
+                 connect_ratio=DEFAULT_CONNECT_RATIO, tolerance=None, variation=None):
+        """(PieceInfo, SeamGraph) של הפריסה — מחושב פעם אחת לכל פרמטרים
+        (TabVariation משווה לפי ערכיו, כך שאותו seed מוצא את אותה רשומה)"""
+        key = (rows, cols, arc_ratio, connect_ratio, tolerance, variation)
+        return self._remember(self._geometry, SESSION_GEOMETRY_CACHE_SIZE, key, lambda: _classicGeometry(
+            self.size, rows, cols, tolerance, arc_ratio, connect_ratio, variation))
+
+    def table(self, rows, cols, arc_ratio=DEFAULT_ARC_RATIO, connect_ratio=DEFAULT_CONNECT_RATIO,
+              tolerance=None, corners=False, variation=None):
+        """PieceTable מלאה של הפריסה (ראה PieceTable.build), מהגאומטריה השמורה"""
+        info, seamGraph = self.geometry(rows, cols, arc_ratio, connect_ratio, tolerance, variation)
+        table = PieceTable.fromGrid(info, seamGraph, corners)
+        table.size = self.size
+        return table
+
+    def _pixels(self, rows, cols):
+        """מערך הפיקסלים עם מסגרות הרשת — נשמר לרשת האחרונה בלבד (עותק מלא)"""
+        if self.source.streaming:
+            return None
+        if self._gridPixels is None or self._gridPixels[0] != (rows, cols):
+            self._gridPixels = (rows, cols), _gridPixels(self.source, rows, cols)
+        return self._gridPixels[1]
+
+    def iterPieces(self, rows, cols, mode="classic", cells=None, arc_ratio=DEFAULT_ARC_RATIO,
+                   connect_ratio=DEFAULT_CONNECT_RATIO, tolerance=None, antialias=False,
+                   workers=None, pool=None, sink=None, pipeline=None, variation=None):
+        """גנרטור של PuzzlePiece כמו iterPuzzlePieces / iterRectangularPieces,
+        בלי לטעון מחדש את התמונה. cells: קבוצת (row, col) — רק החלקים האלה.
+        היחסים, tolerance, antialias, workers, pool ו-variation — במצב classic בלבד"""
+        if mode == "rectangular":
+            items = _rectangularItems(self.source, rows, cols, cells, self._pixels(rows, cols))
+            yield from _pipelineStages(items, _rectangularPiece, sink, pipeline)
+            return
+        info, seamGraph = self.geometry(rows, cols, arc_ratio, connect_ratio, tolerance, variation)
+        yield from _iterClassicPieces(self.source, info, seamGraph, workers, pool, sink, pipeline,
+                                  antialias, cells)
+
+    def outline(self, rows, cols, mode="classic", arc_ratio=DEFAULT_ARC_RATIO,
+                connect_ratio=DEFAULT_CONNECT_RATIO, tolerance=None, variation=None):
+        """(outline_only, outline_with_image) — מסכת הקווים נשמרת לכל פריסה,
+        והתמונות מורכבות ממנה על עותק טרי של בסיס התצוגה בכל קריאה, כך
+        שהמקור נשאר נקי והמטמון אינו מחזיק תמונות RGBA"""
+        if self._preview is None:
+            # בסיס התצוגה של ImageSource הוא התמונה עצמה — לא משתנה כאן,
+            # כי ההדבקה נעשית על עותק
+            self._preview = self.source.preview()
+        base, zoom = self._preview
+
+        def build():
+            if mode == "rectangular":
+                return _gridCompose, _gridOutlineMask(self.source, rows, cols, base.size, zoom)
+            seamGraph = self.geometry(rows, cols, arc_ratio, connect_ratio, tolerance,
+                                      variation)[1]
+            return OutlineLayer.compose, _classicOutlineMask(self.source, seamGraph, base.size, zoom)
+
+        key = (mode, rows, cols) if mode == "rectangular" else \
+            (mode, rows, cols, arc_ratio, connect_ratio, tolerance, variation)
+        compose, mask = self._remember(self._outlines, SESSION_OUTLINE_CACHE_SIZE, key, build)
+        return compose(mask, base.copy())
+
+    def create(self, rows, cols, output_prefix, mode="classic", cells=None, encoder=None,
+               atlas=False, sink=None, arc_ratio=DEFAULT_ARC_RATIO,
+               connect_ratio=DEFAULT_CONNECT_RATIO, tolerance=None, antialias=False,
+               workers=None, pool=None, pipeline=None, profiler=None, progress=None,
+               cancel=None, variation=None):
+        """כמו createPuzzlePieces / create_rectangular_pieces על התמונה של הסשן.
+        cells: כתיבה מחדש של החלקים האלה בלבד (השאר נשארים כמו שהם בתיקייה;
+        לא אפשרי עם atlas, שהאינדקס שלו מכסה את כל הרשת)"""
+        if cells is not None and atlas:
+            raise ValueError("atlas output needs the full grid")
+        profiler = profiler or _NULL_PROFILER
+        if sink is None:
+            sink = (AtlasWriter(output_prefix, self.size, rows, cols, encoder) if atlas
+                    else FileSink(output_prefix, encoder))
+        with profiler.span("setup"):
+            if mode != "rectangular":
+                self.geometry(rows, cols, arc_ratio, connect_ratio, tolerance, variation)
+        pieces = self.iterPieces(rows, cols, mode, cells, arc_ratio, connect_ratio, tolerance,
+                                 antialias, workers, pool, sink, pipeline, variation)
+        cells = _gridCells(rows, cols) if cells is None else \
+            sorted(set(cells) & set(_gridCells(rows, cols)))
+        _drivePieces(pieces, sink, cells, profiler, progress, cancel)
+        with profiler.span("close"):
+            sink.close()
+
+        return _savePreviews(output_prefix, lambda: self.outline(
+            rows, cols, mode, arc_ratio, connect_ratio, tolerance, variation), profiler)
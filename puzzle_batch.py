@@ -0,0 +1,183 @@
+"""הרצת עבודות פאזל רבות בתהליך אחד, בלי GUI.
+
+מניפסט הוא קובץ JSON (רשימת עבודות) או JSON Lines (עבודה בכל שורה):
+
+    [{"image": "a.jpg", "rows": 4, "cols": 6, "mode": "classic", "output_dir": "out/a",
+      "encoder": {"format": "webp", "quality": 85}}]
+
+המפתח "encoder" אופציונלי ומועבר כמו שהוא ל-EncoderConfig; "atlas": true
+אורז את החלקים לגיליונות טקסטורה במקום קובץ לכל חלק; "tolerance" (בפיקסלים)
+מפעיל דגימה אדפטיבית של העקומות בפאזל קלאסי, "antialias": true מחליק את
+קצוות החלקים, ו-"variation" (למשל {"seed": 7}) מועבר ל-TabVariation — לשונית
+שונה לכל תפר.
+
+שימוש משורת הפקודה:
+
+    python -m puzzle_batch manifest.json --workers 8 --report report.json
+
+עם --cache DIR עבודות שכבר רצו עם אותה תמונה ואותם פרמטרים מועתקות מהמטמון.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from jigsaw_puzzle_generator import (
+    createPuzzlePieces, create_rectangular_pieces, RenderPool, EncoderConfig, PipelineConfig,
+    TabVariation,
+)
+from puzzle_cache import PuzzleCache, DEFAULT_MAX_BYTES
+
+MODES = ("classic", "rectangular")
+
+
+class PuzzleJob:
+    """עבודת פאזל אחת מתוך מניפסט"""
+    def __init__(self, image, rows, cols, output_dir, mode="classic", encoder=None, atlas=False,
+                 tolerance=None, antialias=False, variation=None):
+        if mode not in MODES:
+            raise ValueError(f"unknown mode: {mode!r}")
+        self.image = image
+        self.rows = int(rows)
+        self.cols = int(cols)
+        self.output_dir = output_dir
+        self.mode = mode
+        self.encoder = encoder
+        self.atlas = atlas
+        self.tolerance = tolerance
+        self.antialias = antialias
+        self.variation = variation
+
+    @classmethod
+    def from_dict(cls, entry):
+        encoder = entry.get("encoder")
+        variation = entry.get("variation")
+        return cls(entry["image"], entry["rows"], entry["cols"],
+                   entry["output_dir"], entry.get("mode", "classic"),
+                   EncoderConfig(**encoder) if encoder else None,
+                   bool(entry.get("atlas", False)), entry.get("tolerance"),
+                   bool(entry.get("antialias", False)),
+                   TabVariation(**variation) if variation else None)
+
+    @property
+    def output_prefix(self):
+        return f"{self.output_dir}/piece_"
+
+
+def load_manifest(path):
+    """קריאת מניפסט JSON / JSON Lines לרשימת PuzzleJob"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            entries = json.load(f)
+    return [PuzzleJob.from_dict(entry) for entry in entries]
+
+
+def run_job(job, pool=None, stream=False, pipeline=None, cache=None):
+    """הרצת עבודה אחת; מחזיר מילון תוצאה עם זמן ריצה או שגיאה.
+    cache: PuzzleCache אופציונלי — התוצאה מסומנת ב-"cache" לפי סוג הפגיעה
+    """
+    result = {"image": job.image, "rows": job.rows, "cols": job.cols,
+              "mode": job.mode, "output_dir": job.output_dir}
+    start = time.perf_counter()
+    try:
+        os.makedirs(job.output_dir, exist_ok=True)
+        if cache is not None:
+            extra = {"pipeline": pipeline}
+            if job.mode != "rectangular":
+                extra.update(pool=pool, tolerance=job.tolerance, antialias=job.antialias,
+                             variation=job.variation)
+            _, result["cache"] = cache.run(job.image, job.rows, job.cols, job.output_prefix,
+                                           mode=job.mode, encoder=job.encoder, stream=stream,
+                                           atlas=job.atlas, **extra)
+        elif job.mode == "rectangular":
+            create_rectangular_pieces(job.image, job.rows, job.cols, job.output_prefix,
+                                      stream=stream, encoder=job.encoder, atlas=job.atlas,
+                                      pipeline=pipeline)
+        else:
+            createPuzzlePieces(job.image, job.rows, job.cols, job.output_prefix,
+                               stream=stream, pool=pool, encoder=job.encoder, atlas=job.atlas,
+                               pipeline=pipeline, tolerance=job.tolerance,
+                               antialias=job.antialias, variation=job.variation)
+        result["pieces"] = job.rows * job.cols
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def run_batch(jobs, workers=None, stream=False, on_result=None, pipeline=None, cache=None):
+    """הרצת רשימת עבודות בתהליך אחד.
+    תבניות הקצוות נשמרות במטמון בין עבודות עם אותה גאומטריית חלק, ו-pool
+    התהליכים (אם workers > 1) נשאר חם לאורך כל האצווה.
+    on_result: קולבק אופציונלי שנקרא עם תוצאת כל עבודה מיד בסיומה
+    pipeline: PipelineConfig לחפיפת רסטריזציה וכתיבה בתוך כל עבודה
+    cache: PuzzleCache משותף לכל העבודות
+    """
+    pool = RenderPool(workers) if workers and workers > 1 else None
+    results = []
+    try:
+        for job in jobs:
+            result = run_job(job, pool=pool, stream=stream, pipeline=pipeline, cache=cache)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    finally:
+        if pool is not None:
+            pool.close()
+    return results
+
+
+def _print_result(result):
+    status = f"ERROR: {result['error']}" if "error" in result else \
+        f"{result['pieces']} pieces"
+    if result.get("cache"):
+        status += f", cached ({result['cache']})"
+    print(f"{result['seconds']:8.3f}s  {result['mode']:<11} "
+          f"{result['rows']}x{result['cols']:<4} {result['image']}  ({status})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate many jigsaw puzzles from a manifest.")
+    parser.add_argument("manifest", help="JSON list or JSON Lines file of jobs")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="process pool size for piece rendering (kept warm across jobs)")
+    parser.add_argument("--stream", action="store_true",
+                        help="read source images in row bands (for very large images)")
+    parser.add_argument("--raster-threads", type=int, default=None,
+                        help="threads for the masking stage (enables the staged pipeline)")
+    parser.add_argument("--write-threads", type=int, default=None,
+                        help="threads for the encode/write stage (enables the staged pipeline)")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="reuse results of identical jobs from this cache directory")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        metavar="MB", help="cache size limit; least recently used entries go first")
+    parser.add_argument("--report", help="write per-job results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    pipeline = None
+    if args.raster_threads or args.write_threads:
+        pipeline = PipelineConfig(args.raster_threads or 1, args.write_threads or 1)
+
+    cache = PuzzleCache(args.cache, args.cache_size * 1024 * 1024) if args.cache else None
+
+    jobs = load_manifest(args.manifest)
+    start = time.perf_counter()
+    results = run_batch(jobs, workers=args.workers, stream=args.stream,
+                        on_result=_print_result, pipeline=pipeline, cache=cache)
+    total = time.perf_counter() - start
+
+    failed = sum(1 for r in results if "error" in r)
+    print(f"{len(results)} jobs, {failed} failed, {total:.3f}s total")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"total_seconds": total, "jobs": results}, f, indent=2)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
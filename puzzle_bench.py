@@ -0,0 +1,243 @@
+"""מדידת ביצועים של יצירת הפאזל, בלי GUI.
+
+כל מקרה (מצב, גודל תמונה, רשת) רץ בתהליך נפרד על תמונה סינתטית דטרמיניסטית,
+כך שזיכרון השיא (RSS) נמדד לכל מקרה בנפרד. לכל מקרה נמדדים השלבים:
+
+    geometry    — עקומות בזייה, תבניות קצוות וקווי מתאר של כל החלקים
+    raster      — חיתוך ומיסוך החלקים בזיכרון
+    encode      — קידוד החלקים לבתים (בלי דיסק)
+    preview     — ציור תמונות התצוגה המקדימה
+    end_to_end  — createPuzzlePieces / create_rectangular_pieces לתיקייה זמנית
+
+שימוש משורת הפקודה:
+
+    python -m puzzle_bench --sizes 1,4,16 --grids 4x6,20x30 --output bench.json
+    python -m puzzle_bench --preset full --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, __version__ as PIL_VERSION
+
+import jigsaw_puzzle_generator as generator
+from jigsaw_puzzle_generator import (
+    createPuzzlePieces, create_rectangular_pieces, iterRectangularPieces, openImageSource,
+    EncoderConfig,
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MODES = ("classic", "rectangular")
+STAGES = ("geometry", "raster", "encode", "preview", "end_to_end")
+
+PRESETS = {
+    "quick": {"sizes": [1, 4], "grids": [(4, 6), (20, 30)]},
+    "default": {"sizes": [1, 4, 16], "grids": [(4, 6), (20, 30), (50, 50)]},
+    "full": {"sizes": [1, 4, 16, 50, 100], "grids": [(4, 6), (10, 15), (20, 30), (50, 50)]},
+}
+
+
+def synthetic_image(megapixels, seed=0):
+    """תמונת RGB דטרמיניסטית ביחס 3:2 — מדרון עם רעש מאריח שחוזר על עצמו,
+    כדי שהקידוד לא יהיה טריוויאלי וגם לא רעש טהור"""
+    height = int(round((megapixels * 1e6 / 1.5) ** 0.5))
+    width = int(round(height * 1.5))
+    rng = np.random.default_rng(seed)
+    tile = rng.integers(0, 48, size=(256, 256, 3), dtype=np.uint8)
+    noise = np.tile(tile, (-(-height // 256), -(-width // 256), 1))[:height, :width]
+    ramp = np.linspace(0, 200, width, dtype=np.float32)
+    pixels = noise + ramp.astype(np.uint8)[None, :, None]
+    pixels[..., 1] = pixels[..., 1] // 2 + (np.arange(height, dtype=np.uint16) * 100 // height
+                                            ).astype(np.uint8)[:, None]
+    return Image.fromarray(pixels, "RGB")
+
+
+def peak_rss_mb():
+    """זיכרון שיא של התהליך ב-MB (None אם לא נתמך)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux מחזיר KB, macOS בתים
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _classicStages(image, rows, cols, encoder, timings):
+    start = time.perf_counter()
+    generator._EDGE_TEMPLATE_CACHE.clear()
+    source = openImageSource(image)
+    info, seamGraph = generator._classicGeometry(source.size, rows, cols)
+    jobs = [(band, job) for band, bandJobs in generator._classicBands(source, info, seamGraph)
+            for job in bandJobs]
+    timings["geometry"] = time.perf_counter() - start
+
+    raster = encode = 0.0
+    for band, job in jobs:
+        t0 = time.perf_counter()
+        piece = generator._renderPiece(band, *job)
+        t1 = time.perf_counter()
+        piece.encode(encoder)
+        encode += time.perf_counter() - t1
+        raster += t1 - t0
+    timings["raster"] = raster
+    timings["encode"] = encode
+
+    start = time.perf_counter()
+    generator._classicOutline(source, seamGraph)
+    timings["preview"] = time.perf_counter() - start
+
+
+def _rectangularStages(image, rows, cols, encoder, timings):
+    source = openImageSource(image)
+    timings["geometry"] = 0.0
+    raster = encode = 0.0
+    pieces = iter(iterRectangularPieces(source, rows, cols))
+    while True:
+        t0 = time.perf_counter()
+        piece = next(pieces, None)
+        t1 = time.perf_counter()
+        if piece is None:
+            break
+        piece.encode(encoder)
+        encode += time.perf_counter() - t1
+        raster += t1 - t0
+    timings["raster"] = raster
+    timings["encode"] = encode
+
+    start = time.perf_counter()
+    generator._gridOutline(source, rows, cols)
+    timings["preview"] = time.perf_counter() - start
+
+
+def run_case(mode, megapixels, rows, cols, encoder=None, repeat=1, seed=0):
+    """מדידת מקרה אחד בתהליך הנוכחי — מחזיר מילון תוצאה.
+    עם repeat > 1 נשמר הזמן המינימלי של כל שלב"""
+    encoder = encoder or EncoderConfig("png", compress_level=1)
+    image = synthetic_image(megapixels, seed)
+    stages = _classicStages if mode == "classic" else _rectangularStages
+    create = createPuzzlePieces if mode == "classic" else create_rectangular_pieces
+
+    best = {}
+    for _ in range(repeat):
+        timings = {}
+        stages(image, rows, cols, encoder, timings)
+        with tempfile.TemporaryDirectory() as folder:
+            start = time.perf_counter()
+            create(image, rows, cols, os.path.join(folder, "piece_"), encoder=encoder)
+            timings["end_to_end"] = time.perf_counter() - start
+        for stage, seconds in timings.items():
+            best[stage] = min(seconds, best.get(stage, seconds))
+
+    pieces = rows * cols
+    return {
+        "mode": mode, "megapixels": megapixels, "size": list(image.size),
+        "rows": rows, "cols": cols, "pieces": pieces,
+        "stages": best,
+        "pieces_per_s": pieces / best["end_to_end"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _isolated(args):
+    return run_case(*args)
+
+
+def run_suite(modes, sizes, grids, encoder=None, repeat=1, on_result=None):
+    """הרצת כל המקרים, כל אחד בתהליך חדש (בשביל RSS נקי)"""
+    results = []
+    for mode in modes:
+        for megapixels in sizes:
+            for rows, cols in grids:
+                with ProcessPoolExecutor(1) as executor:
+                    result = executor.submit(_isolated, (mode, megapixels, rows, cols,
+                                                         encoder, repeat)).result()
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+    return results
+
+
+def environment():
+    """פרטי הסביבה לשמירה לצד התוצאות"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(), "numpy": np.__version__, "pillow": PIL_VERSION,
+        "platform": platform.platform(), "cpus": os.cpu_count(),
+    }
+
+
+def _caseKey(result):
+    return result["mode"], result["megapixels"], result["rows"], result["cols"]
+
+
+def _print_result(result, baseline=None):
+    stages = "  ".join(f"{stage} {result['stages'][stage]:7.3f}s" for stage in STAGES)
+    rss = result["peak_rss_mb"]
+    line = (f"{result['mode']:<11} {result['megapixels']:>4g} MP {result['rows']:>2}x"
+            f"{result['cols']:<3} {stages}  {result['pieces_per_s']:8.1f} pieces/s"
+            + (f"  {rss:7.0f} MB" if rss is not None else ""))
+    if baseline is not None:
+        before = baseline["stages"]["end_to_end"]
+        line += f"  ({result['stages']['end_to_end'] / before:.2f}x vs baseline)"
+    print(line)
+
+
+def _parseGrid(text):
+    rows, cols = text.lower().split("x")
+    return int(rows), int(cols)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark puzzle generation stages.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="default")
+    parser.add_argument("--sizes", help="comma-separated image sizes in megapixels")
+    parser.add_argument("--grids", help="comma-separated grids, e.g. 4x6,20x30")
+    parser.add_argument("--modes", default=",".join(MODES), help="classic,rectangular")
+    parser.add_argument("--format", default="png", help="piece encoder format (png/webp/jpeg)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case (minimum is kept)")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="earlier JSON results to compare end-to-end time against")
+    args = parser.parse_args(argv)
+
+    preset = PRESETS[args.preset]
+    sizes = [float(s) for s in args.sizes.split(",")] if args.sizes else preset["sizes"]
+    grids = [_parseGrid(g) for g in args.grids.split(",")] if args.grids else preset["grids"]
+    modes = args.modes.split(",")
+    for mode in modes:
+        if mode not in MODES:
+            parser.error(f"unknown mode: {mode!r}")
+    encoder = EncoderConfig(args.format, compress_level=1) if args.format == "png" \
+        else EncoderConfig(args.format)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {_caseKey(r): r for r in json.load(f)["results"]}
+
+    results = run_suite(modes, sizes, grids, encoder, args.repeat,
+                        on_result=lambda r: _print_result(r, baseline.get(_caseKey(r))))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""מטמון תוצאות לפי תוכן לעבודות פאזל חוזרות.
+
+המפתח הוא hash של תוכן התמונה יחד עם כל הפרמטרים שמשפיעים על הפלט (מצב,
+שורות, עמודות, יחסי הקשתות, וריאציית הלשוניות וה-seed שלה, מספר הנקודות,
+streaming, אטלס והגדרות הקידוד).
+פגיעה במטמון מעתיקה את סט החלקים השמור לתיקיית הפלט בלי לחשב דבר — כ-hard
+links כשהמטמון והפלט באותה מערכת קבצים, אחרת בהעתקה. הספרייה מוחקת קובץ פלט
+קיים לפני שהיא כותבת אותו מחדש, כך שרשומה לעולם לא משתנה דרך הפלט; כלי
+חיצוני שעורך את קבצי הפלט במקום ישנה גם את הרשומה.
+
+מבנה התיקייה: <root>/<geometry key>/<encoder key>/ — כשרק הגדרות הקידוד
+משתנות ויש כבר רשומה לא-אובדנית (PNG / WebP lossless) לאותה גאומטריה, החלקים
+מקודדים מחדש ממנה במקום לחשב מחדש חיתוך ומסכות.
+הגודל הכולל חסום, ורשומות שלא נעשה בהן שימוש הכי הרבה זמן נמחקות (LRU).
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from PIL import Image
+
+import jigsaw_puzzle_generator as generator
+from jigsaw_puzzle_generator import (
+    createPuzzlePieces, create_rectangular_pieces, PuzzleSession, DEFAULT_ENCODER, fileStamp,
+)
+
+# להעלות כשהאלגוריתם משנה את הפלט — רשומות ישנות פשוט לא יימצאו
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "puzzle_creator")
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+ENTRY_FILE = "entry.json"
+PREFIX = "piece_"
+
+
+def image_digest(image_input):
+    """sha256 של תוכן התמונה — בתים של הקובץ, או פיקסלים של PIL Image.
+    ל-PuzzleSession — של התמונה שממנה נפתח, רק אם הקובץ לא השתנה מאז
+    (לפי החותמת שנרשמה בפתיחה): אחרת הפיקסלים שבסשן אינם התוכן שב-hash,
+    והרשומה הייתה נשמרת תחת התמונה הלא נכונה"""
+    if isinstance(image_input, PuzzleSession):
+        session = image_input
+        image_input = session.image_input
+        if session.stamp is not None and fileStamp(image_input) != session.stamp:
+            raise ValueError(f"{image_input} changed since the session was opened; "
+                             "open a new PuzzleSession")
+    h = hashlib.sha256()
+    if isinstance(image_input, str):
+        with open(image_input, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+    else:
+        h.update(f"{image_input.mode}:{image_input.size}".encode())
+        h.update(image_input.tobytes())
+    return h.hexdigest()
+
+
+def _digest(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def _dir_size(path):
+    total = 0
+    for folder, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(folder, name))
+    return total
+
+
+def _entry_size(entry):
+    """הגודל שנשמר ב-entry.json — או סריקה, לרשומות שנכתבו בלעדיו"""
+    try:
+        with open(os.path.join(entry, ENTRY_FILE), encoding="utf-8") as f:
+            return json.load(f)["size"]
+    except (OSError, ValueError, KeyError):
+        return _dir_size(entry)
+
+
+def _link(source, target):
+    """hard link מהרשומה לפלט, או העתקה כשאי אפשר (מערכת קבצים אחרת, FAT).
+    קובץ קודם ביעד נמחק קודם — כתיבה דרכו הייתה משנה את הרשומה"""
+    generator.unlinkOutput(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+class PuzzleCache:
+    """מטמון על הדיסק לסטים של חלקי פאזל, חסום בגודל עם פינוי LRU"""
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def keys(self, image_input, rows, cols, mode="classic", encoder=None, stream=False,
+             atlas=False, tolerance=None, antialias=False,
+             arc_ratio=generator.DEFAULT_ARC_RATIO, connect_ratio=generator.DEFAULT_CONNECT_RATIO,
+             variation=None):
+        """(מפתח גאומטריה, מפתח קידוד) לעבודה"""
+        geometry = {
+            "version": CACHE_VERSION,
+            "image": image_digest(image_input),
+            "mode": mode, "rows": rows, "cols": cols,
+            "arc_ratio": arc_ratio,
+            "connect_ratio": connect_ratio,
+            "variation": vars(variation) if variation else None,
+            "point_num": generator.DEFAULT_POINT_NUM,
+            "tolerance": tolerance,
+            "antialias": bool(antialias),
+            "stream": bool(stream),
+        }
+        encoding = {"encoder": vars(encoder or DEFAULT_ENCODER), "atlas": bool(atlas)}
+        return _digest(geometry), _digest(encoding)
+
+    def run(self, image_input, rows, cols, output_prefix, mode="classic", encoder=None,
+            stream=False, atlas=False, **kwargs):
+        """כמו createPuzzlePieces / create_rectangular_pieces, עם מטמון.
+        kwargs (workers, pool, pipeline, profiler, progress, cancel) לא משפיעים
+        על הפלט ולכן לא על המפתח, מלבד tolerance, antialias ו-variation
+        (TabVariation, לפי ערכיו) שנכללים בו.
+        עבודה שבוטלה לא משאירה דבר — לא במטמון ולא בתיקיית הפלט.
+        image_input יכול להיות PuzzleSession — אז החמצה מחושבת בסשן (בלי טעינה
+        מחדש של התמונה), עם מצב ה-streaming שלו, ו-arc_ratio / connect_ratio
+        נכללים במפתח.
+        מחזיר (outline_with_image, hit) — hit הוא "full", "encoder" או None
+        """
+        session = isinstance(image_input, PuzzleSession)
+        if session:
+            stream = image_input.source.streaming
+        geometry_key, encoding_key = self.keys(
+            image_input, rows, cols, mode, encoder, stream, atlas, kwargs.get("tolerance"),
+            kwargs.get("antialias", False),
+            kwargs.get("arc_ratio", generator.DEFAULT_ARC_RATIO),
+            kwargs.get("connect_ratio", generator.DEFAULT_CONNECT_RATIO), kwargs.get("variation"))
+        entry = os.path.join(self.root, geometry_key, encoding_key)
+        hit = "full" if os.path.isdir(entry) else None
+
+        if hit is None:
+            staging = tempfile.mkdtemp(prefix=".staging-", dir=self.root)
+            try:
+                source = None if atlas else self._lossless_sibling(geometry_key)
+                if source is not None:
+                    self._transcode(source, staging, encoder or DEFAULT_ENCODER)
+                    hit = "encoder"
+                elif session:
+                    image_input.create(rows, cols, os.path.join(staging, PREFIX), mode=mode,
+                                       encoder=encoder, atlas=atlas, **kwargs)
+                else:
+                    generate = create_rectangular_pieces if mode == "rectangular" \
+                        else createPuzzlePieces
+                    generate(image_input, rows, cols, os.path.join(staging, PREFIX),
+                             stream=stream, encoder=encoder, atlas=atlas, **kwargs)
+                # הגודל נשמר ברשומה, כדי ש-entries לא יסרוק את כל הקבצים אחרי כל עבודה
+                with open(os.path.join(staging, ENTRY_FILE), "w", encoding="utf-8") as f:
+                    json.dump({"mode": mode, "rows": rows, "cols": cols, "atlas": atlas,
+                               "encoder": vars(encoder or DEFAULT_ENCODER),
+                               "size": _dir_size(staging)}, f)
+                os.makedirs(os.path.dirname(entry), exist_ok=True)
+                try:
+                    os.rename(staging, entry)
+                except OSError:
+                    # עבודה מקבילה כבר שמרה את אותה רשומה
+                    pass
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+
+        self._restore(entry, output_prefix)
+        self._touch(entry)
+        self.evict(keep=entry)
+        with Image.open(f"{output_prefix}outline_with_image.png") as preview:
+            preview.load()
+        return preview, hit
+
+    def _lossless_sibling(self, geometry_key):
+        folder = os.path.join(self.root, geometry_key)
+        if not os.path.isdir(folder):
+            return None
+        for name in os.listdir(folder):
+            entry = os.path.join(folder, name)
+            try:
+                with open(os.path.join(entry, ENTRY_FILE), encoding="utf-8") as f:
+                    meta = json.load(f)
+            except OSError:
+                continue
+            enc = meta["encoder"]
+            if not meta["atlas"] and (enc["format"] == "png" or
+                                      enc["format"] == "webp" and enc["lossless"]):
+                return entry
+        return None
+
+    def _transcode(self, source, target, encoder):
+        """קידוד מחדש של חלקים מרשומה לא-אובדנית; התצוגות מועתקות כמו שהן"""
+        for name in os.listdir(source):
+            path = os.path.join(source, name)
+            base, _ = os.path.splitext(name)
+            if name == ENTRY_FILE:
+                continue
+            if base.startswith(PREFIX + "outline"):
+                shutil.copyfile(path, os.path.join(target, name))
+            else:
+                with Image.open(path) as im:
+                    encoder.save(im.convert("RGBA"), encoder.filename(os.path.join(target, base)))
+
+    def _restore(self, entry, output_prefix):
+        """העתקת הרשומה לתיקיית הפלט — כ-hard links כשאפשר, כך שהחמצה לא
+        כותבת כל חלק פעמיים (למטמון ולפלט)"""
+        folder = os.path.dirname(output_prefix) or "."
+        os.makedirs(folder, exist_ok=True)
+        prefix = os.path.basename(output_prefix)
+        for name in os.listdir(entry):
+            if name == ENTRY_FILE:
+                continue
+            target = os.path.join(folder, prefix + name[len(PREFIX):])
+            if name == PREFIX + "atlas.json" and prefix != PREFIX:
+                # שמות הגיליונות באינדקס תלויים בקידומת הפלט
+                with open(os.path.join(entry, name), encoding="utf-8") as f:
+                    index = json.load(f)
+                index["sheets"] = [prefix + s[len(PREFIX):] for s in index["sheets"]]
+                generator.unlinkOutput(target)
+                with open(target, "w", encoding="utf-8") as f:
+                    json.dump(index, f, separators=(",", ":"))
+            else:
+                _link(os.path.join(entry, name), target)
+
+    def _touch(self, entry):
+        now = time.time()
+        os.utime(os.path.join(entry, ENTRY_FILE), (now, now))
+
+    def entries(self):
+        """רשימת (זמן שימוש אחרון, גודל, נתיב) לכל רשומה"""
+        result = []
+        for geometry_key in os.listdir(self.root):
+            folder = os.path.join(self.root, geometry_key)
+            if geometry_key.startswith(".") or not os.path.isdir(folder):
+                continue
+            for encoding_key in os.listdir(folder):
+                entry = os.path.join(folder, encoding_key)
+                marker = os.path.join(entry, ENTRY_FILE)
+                if os.path.exists(marker):
+                    result.append((os.path.getmtime(marker), _entry_size(entry), entry))
+        return result
+
+    def evict(self, keep=None):
+        """מחיקת הרשומות הישנות ביותר עד שהגודל הכולל נכנס ב-max_bytes"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            parent = os.path.dirname(entry)
+            if not os.listdir(parent):
+                os.rmdir(parent)
+            total -= size
+
+    def clear(self):
+        for _, _, entry in self.entries():
+            shutil.rmtree(entry, ignore_errors=True)
@@ -0,0 +1,268 @@
+"""ייצוא קווי החיתוך של פאזל קלאסי כקובץ וקטורי — SVG או DXF, ללייזר
+ולחיתוך בתבנית.
+
+כל תפר נכתב פעם אחת (גם כשהוא משותף לשני חלקים) כעקומות בזייה מעוקבות
+מקוריות — נקודות הבקרה של PieceOutLine, בלי דגימה לנקודות — ותפרי השוליים
+כקווים ישרים. התמונה עצמה לא נטענת: מספיק הגודל שלה (נקרא מכותרת הקובץ).
+
+שימוש משורת הפקודה:
+
+    python -m puzzle_vector image.jpg 20x30 cuts.svg
+    python -m puzzle_vector 6000x4000 20x30 cuts.dxf --mm-per-px 0.1
+    python -m puzzle_vector 6000x4000 20x30 cuts.svg --seed 7
+"""
+import argparse
+import sys
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+import jigsaw_puzzle_generator as generator
+from jigsaw_puzzle_generator import DEFAULT_ARC_RATIO, DEFAULT_CONNECT_RATIO
+
+FORMATS = ("svg", "dxf")
+
+
+def image_size(image_input):
+    """(רוחב, גובה) — מ-tuple, מ-PIL Image או מכותרת הקובץ בלבד (בלי פענוח)"""
+    if isinstance(image_input, tuple):
+        return image_input
+    if isinstance(image_input, str):
+        with Image.open(image_input) as im:
+            return im.size
+    return image_input.size
+
+
+def cut_seams(size, rows, cols, arc_ratio=DEFAULT_ARC_RATIO,
+              connect_ratio=DEFAULT_CONNECT_RATIO, variation=None):
+    """רשימת (start, end, beziers) לכל תפר ברשת — beziers הוא מערך (S, 4, 2),
+    ריק בתפר ישר. variation: TabVariation — אותן לשוניות כמו בחלקים"""
+    _, seamGraph = generator._classicGeometry(size, rows, cols, None, arc_ratio, connect_ratio,
+                                              variation)
+    return [(seam.start, seam.end, seam.beziers()) for seam in seamGraph.seams()]
+
+
+def _num(value):
+    text = f"{value:.3f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+def _nums(points):
+    """מספרים מעוגלים לאלפית כמחרוזות — בלי פורמט לכל מספר בנפרד"""
+    return map(str, np.round(points, 3).ravel().tolist())
+
+
+def _controls(beziers):
+    """נקודות הבקרה של שרשרת מקטעים רציפה — (3S + 1, 2), בלי כפילויות בחיבורים"""
+    return np.concatenate([beziers[:1, 0], beziers[:, 1:].reshape(-1, 2)])
+
+
+@lru_cache(maxsize=None)
+def _svg_template(segments):
+    # המקטעים רציפים, והראשון מתחיל בפינה — M אחד ואחריו C לכל מקטע
+    return "M{} {}" + "C{} {} {} {} {} {}" * segments if segments else "M{} {}L{} {}"
+
+
+def _svg_path(start, end, beziers):
+    points = _controls(beziers) if len(beziers) else np.array([start, end])
+    return _svg_template(len(beziers)).format(*_nums(points))
+
+
+def to_svg(size, seams, stroke_width=1.0, mm_per_px=None):
+    """מסמך SVG עם path אחד לכל קווי החיתוך (קואורדינטות בפיקסלי התמונה).
+    mm_per_px: גודל פיזי — width / height במילימטרים"""
+    width, height = size
+    if mm_per_px:
+        physical = f'width="{_num(width * mm_per_px)}mm" height="{_num(height * mm_per_px)}mm"'
+    else:
+        physical = f'width="{width}" height="{height}"'
+    d = "".join(_svg_path(*seam) for seam in seams)
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" {physical} viewBox="0 0 {width} {height}">'
+            f'<path d="{d}" fill="none" stroke="#000" stroke-width="{_num(stroke_width)}"/>'
+            f'</svg>\n')
+
+
+# מבנה DXF R2000 מינימלי שקוראי R13+ (AutoCAD וכו') מצפים לו: כל הטבלאות עם
+# הרשומות הנדרשות, בלוקים של model / paper space ומילון שורש ב-OBJECTS. לכל
+# אובייקט handle (קוד 5) ובעלים (330); הישויות מתחילות ב-_DXF_FIRST_HANDLE
+_MODEL_SPACE = "18"
+_DXF_FIRST_HANDLE = 0x100
+
+
+def _groups(*pairs):
+    return "\n".join(str(item) for pair in pairs for item in pair)
+
+
+def _table(name, handle, entries):
+    head = _groups(("0", "TABLE"), ("2", name), ("5", handle), ("330", "0"),
+                   ("100", "AcDbSymbolTable"), ("70", len(entries)))
+    if name == "DIMSTYLE":
+        head += "\n" + _groups(("100", "AcDbDimStyleTable"), ("71", "0"))
+    return "\n".join([head, *entries, _groups(("0", "ENDTAB"))])
+
+
+def _record(kind, handle, owner, subclass, name, *extra):
+    # רשומות DIMSTYLE מסמנות את ה-handle בקוד 105 ולא 5
+    return _groups(("0", kind), ("105" if kind == "DIMSTYLE" else "5", handle), ("330", owner),
+                   ("100", "AcDbSymbolTableRecord"), ("100", subclass), ("2", name),
+                   ("70", "0"), *extra)
+
+
+def _block(handle, end_handle, owner, name, paper=False):
+    space = (("67", "1"),) if paper else ()
+    return _groups(("0", "BLOCK"), ("5", handle), ("330", owner), ("100", "AcDbEntity"),
+                   *space, ("8", "0"), ("100", "AcDbBlockBegin"), ("2", name), ("70", "0"),
+                   ("10", "0"), ("20", "0"), ("30", "0"), ("3", name), ("1", ""),
+                   ("0", "ENDBLK"), ("5", end_handle), ("330", owner), ("100", "AcDbEntity"),
+                   *space, ("8", "0"), ("100", "AcDbBlockEnd"))
+
+
+def _ltype(handle, name):
+    return _record("LTYPE", handle, "5", "AcDbLinetypeTableRecord", name,
+                   ("3", ""), ("72", "65"), ("73", "0"), ("40", "0.0"))
+
+
+def _layer(handle, name):
+    return _record("LAYER", handle, "2", "AcDbLayerTableRecord", name,
+                   ("62", "7"), ("6", "Continuous"))
+
+
+def _dxf_tables(width, height):
+    """CLASSES, TABLES ו-BLOCKS, עד פתיחת ENTITIES. width / height — גודל
+    השרטוט ביחידות הקובץ, לתצוגה הראשונית (*ACTIVE)"""
+    return "\n".join([
+        _groups(("0", "SECTION"), ("2", "CLASSES"), ("0", "ENDSEC"),
+                ("0", "SECTION"), ("2", "TABLES")),
+        _table("VPORT", "8", [_record("VPORT", "1E", "8", "AcDbViewportTableRecord", "*ACTIVE",
+                                      ("10", "0"), ("20", "0"), ("11", "1"), ("21", "1"),
+                                      ("12", _num(width / 2)), ("22", _num(height / 2)),
+                                      ("40", _num(height)), ("41", _num(width / height)))]),
+        _table("LTYPE", "5", [_ltype("14", "ByBlock"), _ltype("15", "ByLayer"),
+                              _ltype("16", "Continuous")]),
+        _table("LAYER", "2", [_layer("10", "0"), _layer("11", "CUT")]),
+        _table("STYLE", "3", [_record("STYLE", "12", "3", "AcDbTextStyleTableRecord", "Standard",
+                                      ("40", "0.0"), ("41", "1.0"), ("50", "0.0"), ("71", "0"),
+                                      ("42", "2.5"), ("3", "txt"), ("4", ""))]),
+        _table("VIEW", "6", []),
+        _table("UCS", "7", []),
+        _table("APPID", "9", [_record("APPID", "13", "9", "AcDbRegAppTableRecord", "ACAD")]),
+        _table("DIMSTYLE", "A", [_record("DIMSTYLE", "17", "A", "AcDbDimStyleTableRecord",
+                                         "Standard")]),
+        _table("BLOCK_RECORD", "1", [
+            _record("BLOCK_RECORD", _MODEL_SPACE, "1", "AcDbBlockTableRecord", "*Model_Space"),
+            _record("BLOCK_RECORD", "1B", "1", "AcDbBlockTableRecord", "*Paper_Space"),
+        ]),
+        _groups(("0", "ENDSEC"), ("0", "SECTION"), ("2", "BLOCKS")),
+        _block("19", "1A", _MODEL_SPACE, "*Model_Space"),
+        _block("1C", "1D", "1B", "*Paper_Space", paper=True),
+        _groups(("0", "ENDSEC"), ("0", "SECTION"), ("2", "ENTITIES")),
+    ])
+
+
+_DXF_OBJECTS = _groups(
+    ("0", "ENDSEC"), ("0", "SECTION"), ("2", "OBJECTS"),
+    ("0", "DICTIONARY"), ("5", "C"), ("330", "0"), ("100", "AcDbDictionary"), ("281", "1"),
+    ("3", "ACAD_GROUP"), ("350", "D"),
+    ("0", "DICTIONARY"), ("5", "D"), ("330", "C"), ("100", "AcDbDictionary"), ("281", "1"),
+    ("0", "ENDSEC"), ("0", "EOF"),
+) + "\n"
+
+
+def to_dxf(size, seams, mm_per_px=None):
+    """DXF R2000: LINE לכל תפר ישר ו-SPLINE מדרגה 3 לכל תפר מעוגל — שרשרת
+    מקטעי בזייה היא B-spline עם קשרים בריבוי 3. SPLINE קיים רק מ-R13, ולכן
+    הקובץ כולל את כל המבנה של R2000 (טבלאות, בלוקים, OBJECTS ו-handles).
+    ציר y הפוך (למעלה ב-DXF); mm_per_px: קואורדינטות במילימטרים"""
+    width, height = size
+    scale = mm_per_px or 1.0
+
+    def points(values):
+        return _nums(np.stack([values[:, 0] * scale, (height - values[:, 1]) * scale], -1))
+
+    entities = []
+    for handle, (start, end, beziers) in enumerate(seams, _DXF_FIRST_HANDLE):
+        controls = _controls(beziers) if len(beziers) else np.array([start, end])
+        entities.append(_dxf_template(len(beziers)).format(f"{handle:X}", *points(controls)))
+
+    header = _groups(
+        ("0", "SECTION"), ("2", "HEADER"), ("9", "$ACADVER"), ("1", "AC1015"),
+        ("9", "$HANDSEED"), ("5", f"{_DXF_FIRST_HANDLE + len(entities):X}"),
+        ("9", "$INSUNITS"), ("70", "4" if mm_per_px else "0"),
+        ("9", "$EXTMIN"), ("10", "0"), ("20", "0"), ("30", "0"),
+        ("9", "$EXTMAX"), ("10", _num(width * scale)), ("20", _num(height * scale)), ("30", "0"),
+        ("0", "ENDSEC"))
+    return "\n".join([header, _dxf_tables(width * scale, height * scale), *entities,
+                      _DXF_OBJECTS])
+
+
+@lru_cache(maxsize=None)
+def _dxf_template(segments):
+    """רשומת LINE (segments=0) או SPLINE של שרשרת segments מקטעים, עם {}
+    ל-handle ולכל קואורדינטה"""
+    entity = ["5", "{}", "330", _MODEL_SPACE, "100", "AcDbEntity", "8", "CUT"]
+    if not segments:
+        return "\n".join(["0", "LINE", *entity, "100", "AcDbLine",
+                          "10", "{}", "20", "{}", "30", "0", "11", "{}", "21", "{}", "31", "0"])
+    knots = [0] * 4 + [k for k in range(1, segments) for _ in range(3)] + [segments] * 4
+    lines = ["0", "SPLINE", *entity, "100", "AcDbSpline",
+             "70", "8", "71", "3", "72", str(len(knots)), "73", str(3 * segments + 1), "74", "0"]
+    for knot in knots:
+        lines += ["40", str(knot)]
+    for _ in range(3 * segments + 1):
+        lines += ["10", "{}", "20", "{}", "30", "0"]
+    return "\n".join(lines)
+
+
+def export_cut_file(image_input, rows, cols, path, arc_ratio=DEFAULT_ARC_RATIO,
+                    connect_ratio=DEFAULT_CONNECT_RATIO, stroke_width=1.0, mm_per_px=None,
+                    variation=None):
+    """כתיבת קובץ החיתוך — הפורמט לפי הסיומת (.svg / .dxf).
+    image_input: נתיב לתמונה, PIL Image או (רוחב, גובה)"""
+    size = image_size(image_input)
+    seams = cut_seams(size, rows, cols, arc_ratio, connect_ratio, variation)
+    if path.lower().endswith(".dxf"):
+        text = to_dxf(size, seams, mm_per_px)
+    elif path.lower().endswith(".svg"):
+        text = to_svg(size, seams, stroke_width, mm_per_px)
+    else:
+        raise ValueError(f"unknown cut file format: {path!r} (use .svg or .dxf)")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def _parse_pair(text):
+    a, b = text.lower().split("x")
+    return int(a), int(b)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export puzzle cut lines as SVG or DXF.")
+    parser.add_argument("image", help="source image, or its size as WIDTHxHEIGHT")
+    parser.add_argument("grid", help="ROWSxCOLS, e.g. 20x30")
+    parser.add_argument("output", help="output path ending in .svg or .dxf")
+    parser.add_argument("--arc-ratio", type=float, default=DEFAULT_ARC_RATIO)
+    parser.add_argument("--connect-ratio", type=float, default=DEFAULT_CONNECT_RATIO)
+    parser.add_argument("--stroke-width", type=float, default=1.0, help="SVG stroke in pixels")
+    parser.add_argument("--mm-per-px", type=float, help="physical scale of one image pixel")
+    parser.add_argument("--seed", type=int,
+                        help="randomize every tab's shape reproducibly from this seed")
+    args = parser.parse_args(argv)
+
+    try:
+        image = _parse_pair(args.image)
+    except ValueError:
+        image = args.image
+    rows, cols = _parse_pair(args.grid)
+    try:
+        variation = None if args.seed is None else generator.TabVariation(args.seed)
+        export_cut_file(image, rows, cols, args.output, args.arc_ratio, args.connect_ratio,
+                        args.stroke_width, args.mm_per_px, variation)
+    except ValueError as e:
+        parser.error(str(e))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
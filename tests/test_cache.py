@@ -0,0 +1,154 @@
+"""PuzzleCache: פגיעות, מפתחות, קידוד מחדש, אטלס, פינוי LRU וביטול"""
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jigsaw_puzzle_generator as generator  # noqa: E402
+from puzzle_cache import ENTRY_FILE, PuzzleCache  # noqa: E402
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    path = str(tmp_path / "source.png")
+    y, x = np.mgrid[0:120, 0:180]
+    pixels = np.stack([x * 3 % 256, y * 5 % 256, (x + y) % 256], -1).astype(np.uint8)
+    Image.fromarray(pixels, "RGB").save(path)
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PuzzleCache(str(tmp_path / "cache"))
+
+
+def pixels(path):
+    with Image.open(path) as im:
+        return np.asarray(im.convert("RGBA"))
+
+
+def read_outputs(folder):
+    outputs = {}
+    for name in sorted(os.listdir(folder)):
+        with open(os.path.join(folder, name), "rb") as f:
+            outputs[name] = f.read()
+    return outputs
+
+
+def test_identical_job_is_a_full_hit(cache, image_path, tmp_path):
+    _, first = cache.run(image_path, 2, 3, str(tmp_path / "a" / "piece_"))
+    _, second = cache.run(image_path, 2, 3, str(tmp_path / "b" / "piece_"))
+    assert (first, second) == (None, "full")
+    assert read_outputs(tmp_path / "a") == read_outputs(tmp_path / "b")
+    assert len(cache.entries()) == 1
+
+
+@pytest.mark.parametrize("change", [
+    {"variation": generator.TabVariation(seed=1)},
+    {"tolerance": generator.DEFAULT_TOLERANCE},
+    {"encoder": generator.EncoderConfig("png", compress_level=1)},
+    {"antialias": True},
+    {"mode": "rectangular"},
+])
+def test_output_parameters_change_the_key(cache, image_path, change):
+    base = cache.keys(image_path, 2, 3)
+    assert cache.keys(image_path, 2, 3, **change) != base
+
+
+def test_same_variation_values_give_the_same_key(cache, image_path):
+    first = cache.keys(image_path, 2, 3, variation=generator.TabVariation(seed=4))
+    assert cache.keys(image_path, 2, 3, variation=generator.TabVariation(seed=4)) == first
+
+
+def test_new_encoder_is_transcoded_from_a_lossless_entry(cache, image_path, tmp_path):
+    cache.run(image_path, 2, 3, str(tmp_path / "png" / "piece_"))
+    encoder = generator.EncoderConfig("webp", lossless=True)
+    _, hit = cache.run(image_path, 2, 3, str(tmp_path / "webp" / "piece_"), encoder=encoder)
+    assert hit == "encoder"
+    # אותם פיקסלים כמו קידוד ישיר (WebP לא שומר צבע מתחת ל-alpha אפס)
+    (tmp_path / "direct").mkdir()
+    generator.createPuzzlePieces(image_path, 2, 3, str(tmp_path / "direct" / "piece_"),
+                                 encoder=encoder)
+    for row in range(2):
+        for col in range(3):
+            name = f"piece_{row}_{col}.webp"
+            np.testing.assert_array_equal(pixels(tmp_path / "webp" / name),
+                                          pixels(tmp_path / "direct" / name))
+
+
+def test_atlas_sheets_are_renamed_for_the_output_prefix(cache, image_path, tmp_path):
+    cache.run(image_path, 2, 3, str(tmp_path / "a" / "piece_"), atlas=True)
+    _, hit = cache.run(image_path, 2, 3, str(tmp_path / "b" / "puzzle_"), atlas=True)
+    assert hit == "full"
+    with open(tmp_path / "b" / "puzzle_atlas.json", encoding="utf-8") as f:
+        index = json.load(f)
+    assert index["sheets"] and all(name.startswith("puzzle_") for name in index["sheets"])
+    for name in index["sheets"]:
+        assert os.path.exists(tmp_path / "b" / name)
+
+
+def test_least_recently_used_entry_is_evicted(cache, image_path, tmp_path):
+    entries = {}
+    for grid in ((2, 3), (3, 2), (3, 3)):
+        cache.run(image_path, *grid, str(tmp_path / "out" / "piece_"))
+        entries[grid] = max(cache.entries())[2]
+    # זמן השימוש האחרון נקבע במפורש: (3, 2) הישנה ביותר
+    for stamp, grid in enumerate(((3, 2), (3, 3), (2, 3))):
+        os.utime(os.path.join(entries[grid], ENTRY_FILE), (stamp, stamp))
+    cache.max_bytes = sum(size for _, size, _ in cache.entries()) - 1
+    cache.evict()
+    remaining = {entry for _, _, entry in cache.entries()}
+    assert remaining == {entries[2, 3], entries[3, 3]}
+
+
+def test_entry_size_is_recorded(cache, image_path, tmp_path):
+    cache.run(image_path, 2, 3, str(tmp_path / "a" / "piece_"))
+    (_, size, entry), = cache.entries()
+    with open(os.path.join(entry, ENTRY_FILE), encoding="utf-8") as f:
+        assert json.load(f)["size"] == size > 0
+
+
+def test_rewriting_restored_output_leaves_the_entry_intact(cache, image_path, tmp_path):
+    output = str(tmp_path / "out" / "piece_")
+    cache.run(image_path, 2, 3, output)
+    expected = pixels(f"{output}0_0.png")
+    # ריצה בלי מטמון לאותה תיקייה, על תמונה אחרת
+    generator.createPuzzlePieces(Image.new("RGB", (180, 120), (0, 0, 255)), 2, 3, output)
+    _, hit = cache.run(image_path, 2, 3, str(tmp_path / "again" / "piece_"))
+    assert hit == "full"
+    np.testing.assert_array_equal(pixels(tmp_path / "again" / "piece_0_0.png"), expected)
+
+
+def test_cancelled_job_leaves_nothing_behind(cache, image_path, tmp_path):
+    cancel = threading.Event()
+
+    def progress(state):
+        if state.done == 2:
+            cancel.set()
+
+    output = tmp_path / "out"
+    with pytest.raises(generator.PuzzleCancelled):
+        cache.run(image_path, 2, 3, str(output / "piece_"), progress=progress, cancel=cancel)
+    assert cache.entries() == []
+    assert os.listdir(cache.root) == []
+    assert not output.exists() or os.listdir(output) == []
+
+
+def test_session_is_refused_after_its_file_changes(cache, tmp_path):
+    path = str(tmp_path / "edit.png")
+    Image.new("RGB", (90, 60), (255, 0, 0)).save(path)
+    session = generator.PuzzleSession(path)
+    Image.new("RGB", (90, 60), (0, 0, 255)).save(path)
+    os.utime(path, ns=(session.stamp[0] + 10 ** 9, session.stamp[0] + 10 ** 9))
+    with pytest.raises(ValueError):
+        cache.run(session, 2, 2, str(tmp_path / "out" / "piece_"))
+    cache.run(generator.PuzzleSession(path), 2, 2, str(tmp_path / "out" / "piece_"))
+    _, hit = cache.run(path, 2, 2, str(tmp_path / "again" / "piece_"))
+    assert hit == "full"
+    assert pixels(tmp_path / "again" / "piece_0_0.png")[20, 20, :3].tolist() == [0, 0, 255]
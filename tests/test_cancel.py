@@ -0,0 +1,55 @@
+"""ביטול עבודה דרך cancel לא משאיר סט חלקי בתיקיית הפלט — גם כשהחלקים
+נכתבים בעובדים, בצינור החוטים או לגיליונות אטלס"""
+import os
+import sys
+import threading
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jigsaw_puzzle_generator as generator  # noqa: E402
+
+
+def cancel_after(count):
+    """(progress, cancel) — cancel נקבע מתוך progress אחרי count חלקים"""
+    cancel = threading.Event()
+    seen = []
+
+    def progress(state):
+        seen.append(state.done)
+        if state.done == count:
+            cancel.set()
+
+    return progress, cancel, seen
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"workers": 2},
+    {"pipeline": generator.PipelineConfig(2, 2)},
+    {"atlas": True},
+    {"encoder": generator.EncoderConfig("jpeg")},
+], ids=["serial", "workers", "pipeline", "atlas", "jpeg"])
+@pytest.mark.parametrize("generate", [generator.createPuzzlePieces,
+                                      generator.create_rectangular_pieces],
+                         ids=["classic", "rectangular"])
+def test_cancel_from_progress_leaves_no_files(tmp_path, generate, options):
+    if generate is generator.create_rectangular_pieces and "workers" in options:
+        pytest.skip("rectangular pieces have no process pool")
+    image = Image.new("RGB", (300, 200), (40, 120, 200))
+    progress, cancel, seen = cancel_after(3)
+    with pytest.raises(generator.PuzzleCancelled):
+        generate(image, 4, 5, str(tmp_path / "piece_"), progress=progress, cancel=cancel,
+                 **options)
+    assert 3 in seen
+    assert os.listdir(tmp_path) == []
+
+
+def test_session_cancel_leaves_no_files(tmp_path):
+    session = generator.PuzzleSession(Image.new("RGB", (300, 200), (40, 120, 200)))
+    progress, cancel, _ = cancel_after(1)
+    with pytest.raises(generator.PuzzleCancelled):
+        session.create(3, 3, str(tmp_path / "piece_"), progress=progress, cancel=cancel)
+    assert os.listdir(tmp_path) == []
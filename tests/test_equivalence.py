@@ -0,0 +1,64 @@
+"""כל דרכי הביצוע נותנות את אותו פלט: מאגר תהליכים, streaming וצינור החוטים
+זהים עד הבית לריצה הסדרתית, והריצה הסדרתית זהה לפלט של הגרסה המקורית"""
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jigsaw_puzzle_generator as generator  # noqa: E402
+
+# sha256 של פיקסלי ה-RGBA של כל החלקים לפי סדר שורות, כפי שהפיקה הגרסה
+# המקורית (לפני המנוע הווקטורי, מטמון התבניות וגרף התפרים) על gradient_image
+GOLDEN = {
+    ((333, 250), 4, 5): "812b15f21f4fe515f2a8c433185af4ab467f08d08968adf539d676669b9b627d",
+    ((640, 480), 3, 4): "2b2457a5440d4c1086da64b728ce1a9013d53345e9d97e50b79e0da627186e47",
+}
+
+
+def gradient_image(size):
+    """תמונה דטרמיניסטית בלי אזורים אחידים — כל פיקסל חתוך לא נכון נראה"""
+    width, height = size
+    y, x = np.mgrid[0:height, 0:width]
+    pixels = np.stack([x * 7 % 256, y * 5 % 256, (x + y) * 3 % 256], -1)
+    return Image.fromarray(pixels.astype(np.uint8), "RGB")
+
+
+def read_outputs(folder):
+    outputs = {}
+    for name in sorted(os.listdir(folder)):
+        with open(os.path.join(folder, name), "rb") as f:
+            outputs[name] = f.read()
+    return outputs
+
+
+@pytest.mark.parametrize("size, rows, cols", sorted(GOLDEN))
+def test_default_classic_output_matches_baseline(size, rows, cols):
+    digest = hashlib.sha256()
+    for piece in generator.iterPuzzlePieces(gradient_image(size), rows, cols):
+        digest.update(piece.image.tobytes())
+    assert digest.hexdigest() == GOLDEN[size, rows, cols]
+
+
+@pytest.mark.parametrize("options", [
+    {"workers": 2},
+    {"stream": True},
+    {"pipeline": generator.PipelineConfig(2, 2)},
+], ids=["workers", "stream", "pipeline"])
+@pytest.mark.parametrize("antialias", [False, True])
+def test_execution_modes_match_serial_output(tmp_path, options, antialias):
+    source = str(tmp_path / "source.png")
+    gradient_image((640, 480)).save(source)
+    runs = {}
+    for name, kwargs in (("serial", {}), ("other", options)):
+        folder = tmp_path / name
+        folder.mkdir()
+        generator.createPuzzlePieces(source, 4, 5, str(folder / "piece_"),
+                                     antialias=antialias, **kwargs)
+        runs[name] = read_outputs(folder)
+    assert len(runs["serial"]) == 4 * 5 + 2
+    assert runs["other"] == runs["serial"]
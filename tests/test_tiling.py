@@ -0,0 +1,65 @@
+"""חלקים סמוכים משלימים זה את זה: סכום ערוצי ה-alpha של כל החלקים, כל אחד
+במקומו בתמונה, הוא אטימות מלאה בכל פיקסל — בלי חורים בקצות הלשוניות ובלי
+חפיפות"""
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jigsaw_puzzle_generator as generator  # noqa: E402
+
+
+def alpha_sum(size, rows, cols, **kwargs):
+    """סכום ה-alpha (0..1) של כל החלקים בקואורדינטות התמונה"""
+    width, height = size
+    total = np.zeros((height, width))
+    image = Image.new("RGB", size, (200, 100, 50))
+    for piece in generator.iterPuzzlePieces(image, rows, cols, antialias=True, **kwargs):
+        left, top, right, bottom = piece.rect
+        alpha = np.asarray(piece.image)[..., 3] / 255.0
+        assert alpha.shape == (bottom - top, right - left)
+        x0, y0 = max(left, 0), max(top, 0)
+        x1, y1 = min(right, width), min(bottom, height)
+        total[y0:y1, x0:x1] += alpha[y0 - top:y1 - top, x0 - left:x1 - left]
+    return total
+
+
+@pytest.mark.parametrize("size, rows, cols", [
+    ((640, 480), 4, 6),
+    ((900, 600), 5, 7),
+    ((1200, 800), 10, 12),
+    ((333, 250), 5, 5),
+])
+def test_antialiased_pieces_tile_the_image(size, rows, cols):
+    total = alpha_sum(size, rows, cols)
+    assert np.abs(total - 1.0).max() <= 0.02
+
+
+def test_antialiased_tiling_with_adaptive_curves():
+    total = alpha_sum((640, 480), 4, 6, tolerance=generator.DEFAULT_TOLERANCE)
+    assert np.abs(total - 1.0).max() <= 0.02
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2, 3])
+@pytest.mark.parametrize("size", [(640, 640), (640, 480)])
+def test_extreme_tab_variation_never_collides(seed, size):
+    # הקצוות של כל הטווחים המותרים — לשוניות סמוכות עדיין לא חופפות
+    variation = generator.TabVariation(seed=seed, size=0.49, shift=0.15, skew=0.49,
+                                       jitter=0.49)
+    total = alpha_sum(size, 8, 8, variation=variation)
+    assert np.abs(total - 1.0).max() <= 0.02
+
+
+@pytest.mark.parametrize("size, rows, cols", [
+    ((400, 300), 1, 1),
+    ((500, 100), 1, 5),
+    ((100, 500), 5, 1),
+])
+def test_tab_variation_on_single_row_or_column(size, rows, cols):
+    # ב-1x1 אין תפרים פנימיים כלל, וב-1xN יש רק תפרים בכיוון אחד
+    total = alpha_sum(size, rows, cols, variation=generator.TabVariation(seed=5))
+    assert np.abs(total - 1.0).max() <= 0.02
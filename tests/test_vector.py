@@ -0,0 +1,75 @@
+"""ייצוא קווי החיתוך: קובץ DXF במבנה R2000 מלא, ו-SVG עם כל התפרים"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jigsaw_puzzle_generator as generator  # noqa: E402
+import puzzle_vector  # noqa: E402
+
+
+def dxf_groups(text):
+    """זוגות (קוד, ערך) של קובץ DXF"""
+    lines = text.split("\n")
+    return list(zip(map(int, lines[0:-1:2]), lines[1::2]))
+
+
+def dxf_objects(groups):
+    """(סוג, {קוד: [ערכים]}) לכל אובייקט — כל מה שבין שני קודי 0"""
+    objects = []
+    for code, value in groups:
+        if code == 0:
+            objects.append((value, {}))
+        else:
+            objects[-1][1].setdefault(code, []).append(value)
+    return objects
+
+
+@pytest.mark.parametrize("rows, cols, variation", [
+    (3, 4, None),
+    (3, 4, generator.TabVariation(seed=3)),
+    (1, 1, None),
+])
+def test_dxf_has_the_r2000_structure(rows, cols, variation):
+    seams = puzzle_vector.cut_seams((640, 480), rows, cols, variation=variation)
+    groups = dxf_groups(puzzle_vector.to_dxf((640, 480), seams))
+    objects = dxf_objects(groups)
+    header = {name: value for (code, name), (_, value) in zip(groups, groups[1:]) if code == 9}
+    kinds = [kind for kind, _ in objects]
+    assert kinds[-1] == "EOF"
+    sections = [fields[2][0] for kind, fields in objects if kind == "SECTION"]
+    assert sections == ["HEADER", "CLASSES", "TABLES", "BLOCKS", "ENTITIES", "OBJECTS"]
+    tables = [fields[2][0] for kind, fields in objects if kind == "TABLE"]
+    assert sorted(tables) == sorted(["VPORT", "LTYPE", "LAYER", "STYLE", "VIEW", "UCS", "APPID",
+                                     "DIMSTYLE", "BLOCK_RECORD"])
+    # כל אובייקט עם handle ייחודי, וכולם מתחת ל-$HANDSEED
+    handles = [int(fields.get(5, fields.get(105))[0], 16) for kind, fields in objects
+               if kind not in ("SECTION", "ENDSEC", "ENDTAB", "EOF")]
+    assert len(handles) == len(set(handles))
+    assert max(handles) < int(header["$HANDSEED"], 16)
+    entities = [fields for kind, fields in objects if kind in ("LINE", "SPLINE")]
+    assert len(entities) == len(seams)
+    assert all(fields[330] == [puzzle_vector._MODEL_SPACE] for fields in entities)
+
+
+def test_dxf_reads_cleanly_with_ezdxf(tmp_path):
+    ezdxf = pytest.importorskip("ezdxf")
+    from ezdxf import recover
+
+    path = str(tmp_path / "cuts.dxf")
+    puzzle_vector.export_cut_file((640, 480), 3, 4, path, mm_per_px=0.1,
+                                  variation=generator.TabVariation(seed=1))
+    doc = ezdxf.readfile(path)
+    assert doc.dxfversion == "AC1015"
+    types = [entity.dxftype() for entity in doc.modelspace()]
+    assert types.count("LINE") == 2 * (3 + 4) and types.count("SPLINE") == 2 * 3 * 4 - 3 - 4
+    _, auditor = recover.readfile(path)
+    assert not auditor.has_errors and not auditor.has_fixes
+
+
+def test_svg_has_one_subpath_per_seam():
+    seams = puzzle_vector.cut_seams((640, 480), 3, 4)
+    svg = puzzle_vector.to_svg((640, 480), seams)
+    assert svg.startswith("<svg") and svg.count("M") == len(seams)